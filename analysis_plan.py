@@ -0,0 +1,79 @@
+from collections import OrderedDict
+import threading
+import numpy as np
+from chroma import chroma_matrix
+from harmonic import harmonic_sum_spectrum
+from constant_q import ConstantQPlan
+
+class AnalysisPlan:
+    """Everything process_audio needs for one (frame length, sample rate) pair, built once."""
+
+    NOISE_PERCENTILE = 75  # Most rfft bins lie outside the filtered band, so this is still noise
+
+    def __init__(self, n, sample_rate, low_freq=55, high_freq=2500):
+        self.n = n
+        self.sample_rate = sample_rate
+        self.window = np.blackman(n)
+        self.freqs = np.fft.rfftfreq(n, 1 / sample_rate)
+        self.band = slice(int(np.searchsorted(self.freqs, low_freq, side='left')),
+                          int(np.searchsorted(self.freqs, high_freq, side='right')))
+        # find_peaks rejects a distance below one bin, which short live blocks would otherwise ask for
+        self.peak_distance = max(int(30 * (n / sample_rate)), 1)
+        self._scratch = threading.local()
+
+    def scratch(self):
+        # Scratch buffers are per thread so live and file analysis can share a plan
+        buffers = getattr(self._scratch, "buffers", None)
+        if buffers is None:
+            buffers = (np.empty(self.n), np.empty(len(self.freqs)))
+            self._scratch.buffers = buffers
+        return buffers
+
+    def magnitude_spectrum(self, frame):
+        """Windowed rfft magnitude of one frame, written into this thread's scratch buffer."""
+        windowed, magnitude = self.scratch()
+        np.multiply(frame, self.window, out=windowed)
+        np.abs(np.fft.rfft(windowed), out=magnitude)
+        return magnitude
+
+    def magnitudes(self, frames):
+        """Windowed rfft magnitudes of a (frames, n) batch."""
+        return np.abs(np.fft.rfft(frames * self.window, axis=-1))
+
+    def in_band(self, bins):
+        return (bins >= self.band.start) & (bins < self.band.stop)
+
+    def peak_frequencies(self, magnitude, peaks):
+        return self.freqs[peaks]
+
+    def harmonic_salience(self, magnitude):
+        return harmonic_sum_spectrum(magnitude)
+
+    def chroma_matrix(self):
+        return chroma_matrix(self.n, self.sample_rate)
+
+MAX_PLANS = 8
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+
+def get_analysis_plan(n, sample_rate, spectrum="fft"):
+    """Return the cached plan for (n, sample_rate), evicting the least recently used one when full.
+
+    spectrum "fft" gives linear rfft bins, "cqt" constant-Q bins (see constant_q).
+    """
+    key = (spectrum, n, sample_rate)
+    with _plans_lock:
+        plan = _plans.get(key)
+        if plan is not None:
+            _plans.move_to_end(key)
+            return plan
+    if spectrum == "cqt":
+        plan = ConstantQPlan(n, sample_rate)
+    else:
+        plan = AnalysisPlan(n, sample_rate)
+    with _plans_lock:
+        plan = _plans.setdefault(key, plan)
+        _plans.move_to_end(key)
+        while len(_plans) > MAX_PLANS:
+            _plans.popitem(last=False)
+    return plan
@@ -0,0 +1,117 @@
+"""Headless batch analysis: python -m andra_cli FILE_OR_DIR [...] -o results.jsonl
+
+Writes one JSON object per audio file. Never imports tkinter, so it runs on machines without a display.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from audio_processing import shard_executor
+from chord_tracking import SWITCH_PENALTY
+from event_store import EventStore
+from file_analysis import FileAnalyzer, find_audio_files
+from result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache, json_default
+from spectral_gate import CHANGE_TOLERANCE, MAX_INTERVAL
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m andra_cli", description="Detect notes and chords in audio files.")
+    parser.add_argument("paths", nargs="+", help="audio files or directories to analyze")
+    parser.add_argument("-o", "--output", help="JSON Lines file to write (default: stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes per file")
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    parser.add_argument("--chunk-length", type=float, default=1, help="chunk length in seconds")
+    parser.add_argument("--overlap", type=float, default=0.5, help="hop between chunks as a fraction of a chunk")
+    parser.add_argument("--no-recursive", action="store_true", help="do not descend into subdirectories")
+    parser.add_argument("--chunks", action="store_true", help="include every chunk result in the output")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="shared on-disk result cache")
+    parser.add_argument("--cache-size-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024))
+    parser.add_argument("--no-cache", action="store_true", help="always re-analyze, do not read or write the cache")
+    parser.add_argument("--events-db", help="also append every detection event to this SQLite event store")
+    parser.add_argument("--chord-engine", choices=("notes", "chroma"), default="notes",
+                        help="name chords from the detected notes, or match chroma against chord templates")
+    parser.add_argument("--smooth-chords", action="store_true",
+                        help="decode each file's chord sequence with the chord-tracking HMM (Viterbi)")
+    parser.add_argument("--switch-penalty", type=float, default=SWITCH_PENALTY,
+                        help="log-odds against a chord change between chunks, for --smooth-chords and live tracking")
+    parser.add_argument("--gate", action="store_true",
+                        help="reuse the previous chunk's result while the spectrum stays within --gate-tolerance")
+    parser.add_argument("--gate-tolerance", type=float, default=CHANGE_TOLERANCE,
+                        help="relative spectral change below which a chunk is not re-analyzed")
+    parser.add_argument("--gate-max-interval", type=float, default=MAX_INTERVAL,
+                        help="seconds after which a chunk is analyzed however stable the spectrum")
+    parser.add_argument("--timelines", metavar="DIR",
+                        help="also save every file's chunk timeline to DIR as .npz (see timeline.ResultTimeline.load)")
+    parser.add_argument("--spectrum", choices=("fft", "cqt"), default="fft",
+                        help="linear FFT bins, or constant-Q bins that resolve bass notes in shorter chunks")
+    return parser
+
+def timeline_path(timeline_dir, path):
+    # Flattened full path, so equal file names from different folders do not collide
+    name = os.path.abspath(path).strip(os.sep).replace(os.sep, "__")
+    return os.path.join(timeline_dir, os.path.splitext(name)[0] + ".npz")
+
+def analyze_paths(analyzer, paths, output, include_chunks=False, event_store=None, timeline_dir=None):
+    """Analyze every file and write one JSON line each; returns the number of failed files."""
+    failures = 0
+    for path in paths:
+        started = time.perf_counter()
+        if event_store is not None:
+            event_store.start_session("file", path)
+        try:
+            summary = analyzer.analyze(path)
+        except Exception as e:
+            failures += 1
+            # Type included: some decoder errors (EOFError from audioread) have no message
+            record = {"file": path, "error": f"{type(e).__name__}: {e}" if str(e) else type(e).__name__}
+        else:
+            record = {"file": path}
+            record.update((key, value) for key, value in summary.items() if key not in ("file", "timeline"))
+            if include_chunks:
+                record["chunk_results"] = summary["timeline"].to_results()
+            if timeline_dir is not None:
+                summary["timeline"].save(timeline_path(timeline_dir, path))
+        record["elapsed_s"] = round(time.perf_counter() - started, 3)
+        output.write(json.dumps(record, default=json_default) + "\n")
+        output.flush()
+    return failures
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    paths = find_audio_files(args.paths, recursive=not args.no_recursive)
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(args.cache_dir, max_bytes=int(args.cache_size_mb * 1024 * 1024))
+    # One pool for every file, so its workers start once per run
+    executor = shard_executor(args.workers) if args.workers > 1 else None
+    analyzer = FileAnalyzer(sample_rate=args.sample_rate, chunk_length=args.chunk_length,
+                            overlap=args.overlap, workers=args.workers, cache=cache, executor=executor)
+    analyzer.processor.CHORD_ENGINE = args.chord_engine
+    analyzer.processor.SPECTRUM = args.spectrum
+    analyzer.processor.FILE_CHORD_SMOOTHING = args.smooth_chords
+    analyzer.processor.CHORD_SWITCH_PENALTY = args.switch_penalty
+    analyzer.processor.SPECTRAL_GATING = args.gate
+    analyzer.processor.GATE_TOLERANCE = args.gate_tolerance
+    analyzer.processor.GATE_MAX_INTERVAL = args.gate_max_interval
+    if args.timelines:
+        os.makedirs(args.timelines, exist_ok=True)
+    event_store = None
+    if args.events_db:
+        event_store = EventStore(args.events_db)
+        analyzer.processor.subscribe(event_store.record)
+    try:
+        if args.output:
+            with open(args.output, "w") as output:
+                failures = analyze_paths(analyzer, paths, output, args.chunks, event_store, args.timelines)
+        else:
+            failures = analyze_paths(analyzer, paths, sys.stdout, args.chunks, event_store, args.timelines)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if event_store is not None:
+            event_store.close()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
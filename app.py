@@ -5,6 +5,7 @@ from log_manager import LogManager
 from live_audio import LiveAudio
 from audio_processing import AudioProcessor
 from file_operations import FileOperations
+from event_store import EventStore
 
 class MusicScaleDetectorApp:
     def __init__(self, root):
@@ -41,8 +42,27 @@ class MusicScaleDetectorApp:
         self.live_audio = LiveAudio(self)
         self.audio_processing = AudioProcessor(self)
         self.file_operations = FileOperations(self)
+        self.audio_processing.subscribe(self.gui_components.show_analysis_result)
+        # Every detection is persisted, independently of how often the log display is updated
+        try:
+            self.event_store = EventStore()
+            self.audio_processing.subscribe(self.event_store.record)
+        except Exception as e:
+            print(f"Detection events will not be saved: {e}")
+            self.event_store = None
 
         self.gui_components.create_main_window()
+        self.gui_components.start_display_refresh()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        # Stop whatever is still producing results, then commit the events still queued
+        self.file_operations.close()
+        if self.live_audio.is_listening():
+            self.live_audio.stop_listening()
+        if self.event_store is not None:
+            self.event_store.close()
+        self.root.destroy()
     
     # GUI methods
     def open_live_window(self):
@@ -58,14 +78,14 @@ class MusicScaleDetectorApp:
         self.gui_components.return_to_main_window()
 
     # Log methods
-    def save_log_to_file(self, log_content):
-        self.log_manager.save_log_to_file(log_content)
+    def save_log_to_file(self):
+        self.log_manager.save_log_to_file()
 
-    def clear_log(self, log_text_widget):
-        self.log_manager.clear_log(log_text_widget)
+    def clear_log(self, log_view):
+        self.log_manager.clear_log(log_view)
 
-    def add_to_log(self, message, highlight=False):
-        self.log_manager.add_to_log(message, highlight)
+    def add_to_log(self, message, highlight=False, **fields):
+        self.log_manager.add_to_log(message, highlight, **fields)
 
     # Live methods
     def toggle_listening(self):
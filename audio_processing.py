@@ -1,16 +1,163 @@
-from collections import Counter
+from collections import deque
+import itertools
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 import time
 import traceback
 import numpy as np
-from scipy.signal import butter, lfilter, find_peaks
+from scipy.signal import butter, find_peaks
+from audio_filters import bandpass_filter, StreamingBandpass
+from analysis_plan import get_analysis_plan
+from chord_table import (MIDI_NOTE_NAMES, NOTE_NAMES, NOTE_VALUES, chord_name, frequencies_to_midi,
+                         midi_to_names, pitch_class_mask)
+from harmonic import rank_fundamentals
+from chroma import chromagram, match_chords
+from instrumentation import Profiler
+from spectral_gate import CHANGE_TOLERANCE, MAX_INTERVAL, SpectralGate
+from chord_tracking import NO_CHORD, SWITCH_PENALTY, ChordTracker, notes_chroma, template_scores
+
+NO_NOTES = np.empty(0, dtype=np.int16)
+
+def yin_difference(frames, tau_max):
+    """YIN difference function d(tau) for tau in [0, tau_max) of each row, via FFT autocorrelation."""
+    n = frames.shape[-1]
+    fft_size = 1 << int(np.ceil(np.log2(2 * n - 1)))
+    spectrum = np.fft.rfft(frames, fft_size, axis=-1)
+    acf = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, fft_size, axis=-1)[..., :tau_max]
+
+    # d(tau) = sum(x[:n-tau]**2) + sum(x[tau:]**2) - 2 * acf(tau)
+    energy = np.zeros(frames.shape[:-1] + (n + 1,))
+    np.cumsum(frames ** 2, axis=-1, out=energy[..., 1:])
+    taus = np.arange(tau_max)
+    diff = energy[..., n - taus] + (energy[..., -1:] - energy[..., taus]) - 2 * acf
+    return np.maximum(diff, 0)
+
+def yin_pitch_frames(frames, sample_rate, fmin=40, fmax=3000, threshold=0.15):
+    """Estimate the pitch of every row of a (frames, n) matrix with YIN.
+
+    Returns an array of frequencies in Hz, NaN where no lag dips below the threshold.
+    Lags are capped at n // 2 so that every lag still compares half a frame.
+    """
+    frames = np.atleast_2d(np.asarray(frames, dtype=np.float64))
+    n = frames.shape[-1]
+    tau_min = max(int(sample_rate / fmax), 2)
+    tau_max = min(int(sample_rate / fmin), n // 2)
+    pitches = np.full(frames.shape[0], np.nan)
+    if tau_max - tau_min < 3:
+        return pitches
+
+    diff = yin_difference(frames, tau_max)
+
+    # Cumulative mean normalized difference function
+    running_sum = np.cumsum(diff[:, 1:], axis=-1)
+    cmndf = np.ones_like(diff)
+    np.divide(diff[:, 1:] * np.arange(1, tau_max), running_sum, out=cmndf[:, 1:], where=running_sum > 0)
+
+    # First lag under the threshold, then walk down to the bottom of that dip
+    search = cmndf[:, tau_min:]
+    below = search < threshold
+    found = below.any(axis=-1)
+    first = np.argmax(below, axis=-1)
+    rising = np.append(search[:, 1:] >= search[:, :-1], np.ones((search.shape[0], 1), dtype=bool), axis=-1)
+    rising &= np.arange(search.shape[1]) >= first[:, np.newaxis]
+    tau = np.argmax(rising, axis=-1) + tau_min
+
+    # Parabolic interpolation around the dip
+    rows = np.arange(frames.shape[0])
+    inner = (tau > tau_min) & (tau < tau_max - 1)
+    left = cmndf[rows, np.clip(tau - 1, 0, tau_max - 1)]
+    centre = cmndf[rows, tau]
+    right = cmndf[rows, np.clip(tau + 1, 0, tau_max - 1)]
+    curvature = left - 2 * centre + right
+    shift = np.zeros(len(rows))
+    np.divide(left - right, 2 * curvature, out=shift, where=inner & (curvature > 0))
+
+    pitches[found] = sample_rate / (tau[found] + shift[found])
+    return pitches
+
+def chunk_starts(total_samples, chunk_samples, hop_samples):
+    # Same chunk grid as the original file loop: range(0, len(y) - chunk_samples, hop)
+    return np.arange(0, max(total_samples - chunk_samples, 0), hop_samples)
+
+def select_by_distance(bins, heights, distance):
+    """Keep the highest peaks so that no two kept bins are closer than distance, like find_peaks."""
+    if distance <= 1 or len(bins) < 2:
+        return bins
+    keep = np.ones(len(bins), dtype=bool)
+    for i in np.argsort(heights)[::-1]:
+        if not keep[i]:
+            continue
+        close = np.abs(bins - bins[i]) < distance
+        close[i] = False
+        keep &= ~close
+    return bins[keep]
+
+def shard_executor(workers):
+    """Process pool for process_audio_stream's shards.
+
+    Starting a worker means a fresh interpreter importing NumPy and SciPy, so callers that
+    analyze several files should create one pool and pass it to every call.
+    """
+    # Not fork: the audio, GUI and event store threads may hold locks at fork time
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def _analyze_shard(shard):
+    # Runs in a worker process; a shard carries its slice of the raw and already filtered signal
+    raw, filtered, start_sample, sample_rate, chunk_samples, hop_samples, settings = shard
+    processor = AudioProcessor()
+    processor.__dict__.update(settings)
+    return processor.process_audio_batch(raw, sample_rate, chunk_samples, hop_samples,
+                                         start_sample=start_sample, filtered_audio=filtered)
 
 class AudioProcessor:
-    def __init__(self, app):
+    """Pure analysis core: takes arrays, returns result dicts and publishes them to subscribers."""
+
+    def __init__(self, app=None):
         self.SAMPLE_RATE = 44100
         self.NOISE_THRESHOLD = 0.005
         self.app = app
+        self.stream_filters = {}
+        self.subscribers = []
+        self.BATCH_FRAMES = 32
+        self.SHARD_CHUNKS = 64
+        self.YIN_WINDOW = 2048  # Newest samples of a live window handed to the YIN fallback
+        self.profiler = Profiler(enabled=False)  # Per-stage timings, toggled from the GUI
+        # "peaks": loudest peaks with a bonus for having harmonics; "harmonic_sum": harmonic-sum salience
+        self.FUNDAMENTAL_RANKING = "peaks"
+        # File-mode chords: "notes" names the detected notes' chord, "chroma" matches chord templates
+        self.CHORD_ENGINE = "notes"
+        # "fft": linear rfft bins; "cqt": constant-Q bins, finer than the FFT in the bass (see constant_q)
+        self.SPECTRUM = "fft"
+        # Live chords come from an HMM forward filter; CHORD_SWITCH_PENALTY is the log-odds against
+        # changing chord between frames. FILE_CHORD_SMOOTHING also Viterbi-decodes whole files.
+        self.CHORD_SWITCH_PENALTY = SWITCH_PENALTY
+        self.FILE_CHORD_SMOOTHING = False
+        self.chord_tracker = ChordTracker(self.CHORD_SWITCH_PENALTY)
+        self.note_history = deque(maxlen=3)
+        # Spectral-change gating: frames whose spectrum moved less than GATE_TOLERANCE since the
+        # last full analysis reuse its result, for at most GATE_MAX_INTERVAL seconds
+        self.SPECTRAL_GATING = False
+        self.GATE_TOLERANCE = CHANGE_TOLERANCE
+        self.GATE_MAX_INTERVAL = MAX_INTERVAL
+        self.live_gate = SpectralGate()
 
     #Processing Audio
+    def analysis_settings(self):
+        # The settings that change file-mode results; worker processes and the result cache need them
+        return {
+            "NOISE_THRESHOLD": self.NOISE_THRESHOLD,
+            "FUNDAMENTAL_RANKING": self.FUNDAMENTAL_RANKING,
+            "CHORD_ENGINE": self.CHORD_ENGINE,
+            "SPECTRUM": self.SPECTRUM,
+            "CHORD_SWITCH_PENALTY": self.CHORD_SWITCH_PENALTY,
+            "FILE_CHORD_SMOOTHING": self.FILE_CHORD_SMOOTHING,
+            "SPECTRAL_GATING": self.SPECTRAL_GATING,
+            "GATE_TOLERANCE": self.GATE_TOLERANCE,
+            "GATE_MAX_INTERVAL": self.GATE_MAX_INTERVAL,
+        }
+    #Processing Audio
     def butter_bandpass(self, lowcut, highcut, fs, order=5):
         nyquist = 0.5 * fs
         low = lowcut / nyquist
@@ -18,24 +165,39 @@ class AudioProcessor:
         b, a = butter(order, [low, high], btype='band')
         return b, a
     #Processing Audio   
-    def filter_audio(self, audio_buffer, lowcut=40, highcut=3000):
+    def filter_audio(self, audio_buffer, lowcut=40, highcut=3000, fs=None, stream=False):
         # Narrower bandpass filtering (40Hz to 3000Hz) to reduce harmonics
-        b, a = self.butter_bandpass(lowcut, highcut, self.SAMPLE_RATE)
-        filtered_audio = lfilter(b, a, audio_buffer)
-        return filtered_audio
+        if fs is None:
+            fs = self.SAMPLE_RATE
+        if stream:
+            # Consecutive live blocks share one filter so no block starts cold
+            return self.get_stream_filter(lowcut, highcut, fs).process(audio_buffer)
+        return bandpass_filter(audio_buffer, lowcut, highcut, fs)
+    #Processing Audio
+    def get_stream_filter(self, lowcut, highcut, fs, order=5):
+        key = (lowcut, highcut, fs, order)
+        stream_filter = self.stream_filters.get(key)
+        if stream_filter is None:
+            stream_filter = StreamingBandpass(lowcut, highcut, fs, order)
+            self.stream_filters[key] = stream_filter
+        return stream_filter
+    #Processing Audio
+    def reset_filters(self):
+        # Called when listening restarts so the new stream does not inherit old state
+        for stream_filter in self.stream_filters.values():
+            stream_filter.reset()
+        self.note_history.clear()
+        self.chord_tracker.reset()
+        self.live_gate = SpectralGate()
     #Processing Audio
     def frequency_to_note(self, frequency):
+        # Single-value convenience; the analysis itself works on arrays of MIDI numbers (frequencies_to_midi)
         if frequency <= 0:
             return None
-        # Convert frequency to MIDI note number and map to a note name
-        note_number = 12 * np.log2(frequency / 440) + 69
-        notes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-        octave = int((note_number - 12) / 12)
-        note_idx = int(round(note_number)) % 12
-        # Include octave number for better identification
-        return f"{notes[note_idx]}{octave}"
+        midi = round(12 * math.log2(frequency / 440.0) + 69)
+        return MIDI_NOTE_NAMES[midi] if 0 <= midi < len(MIDI_NOTE_NAMES) else None
     #Processing Audio
-    def identify_chord(self, notes, include_octave=False):
+    def identify_chord(self, notes, include_octave=False, slash=False):
         if not notes or len(notes) < 2:
             return "No chord detected"
 
@@ -45,69 +207,315 @@ class AudioProcessor:
         else:
             base_notes = notes
 
-        chord_types = {
-            'Major': [0, 4, 7],
-            'Minor': [0, 3, 7],
-            'Diminished': [0, 3, 6],
-            'Augmented': [0, 4, 8],
-            'Sus2': [0, 2, 7],
-            'Sus4': [0, 5, 7],
-            '7': [0, 4, 7, 10],
-            'Maj7': [0, 4, 7, 11],
-            'm7': [0, 3, 7, 10],
-            'm7b5': [0, 3, 6, 10],
-            '6': [0, 4, 7, 9],
-            'm6': [0, 3, 7, 9],
-        }
-        note_values = {'C': 0, 'C#': 1, 'D': 2, 'D#': 3, 'E': 4, 'F': 5, 
-                       'F#': 6, 'G': 7, 'G#': 8, 'A': 9, 'A#': 10, 'B': 11}
-
-        numeric_notes = [note_values[note] for note in base_notes if note in note_values]
+        numeric_notes = [NOTE_VALUES[note] for note in base_notes if note in NOTE_VALUES]
         if not numeric_notes:
             return "Unknown chord"
 
-        best_match = None
-        best_score = 0
-        for root in numeric_notes:
-            normalized_notes = sorted(list(set([(n - root) % 12 for n in numeric_notes])))
-            for chord_name, pattern in chord_types.items():
-                common = set(normalized_notes) & set(pattern)
-                pattern_coverage = len(common) / len(pattern)
-                chord_coverage = len(common) / len(normalized_notes) if normalized_notes else 0
-                score = pattern_coverage * 0.7 + chord_coverage * 0.3
-                if pattern_coverage >= 0.7 and score > best_score:
-                    best_score = score
-                    root_note = list(note_values.keys())[list(note_values.values()).index(root)]
-                    best_match = f"{root_note} {chord_name}"
-
+        # Notes come lowest first, so the first one is the bass
+        best_match = chord_name(pitch_class_mask(numeric_notes), numeric_notes, slash)
         return best_match if best_match else "Unknown chord"
     #Processing Audio
     def yin_pitch(self, signal):
-        tau_min = int(self.SAMPLE_RATE / 3000)  # Highest frequency (3000Hz)
-        tau_max = int(self.SAMPLE_RATE / 40)    # Lowest frequency (40Hz)
-        # Compute difference function
-        diff = np.array([np.sum((signal[:len(signal)-tau] - signal[tau:])**2)
-                         for tau in range(tau_min, tau_max)])
-        # Cumulative mean normalized difference function
-        cmndf = np.zeros_like(diff)
-        cmndf[0] = 1
-        running_sum = 0.0
-        for tau in range(1, len(diff)):
-            running_sum += diff[tau]
-            cmndf[tau] = diff[tau] * (tau + 1) / running_sum if running_sum != 0 else 1
-
-        # Lower threshold for better detection
-        yin_threshold = 0.15
-        candidates = np.where(cmndf < yin_threshold)[0]
-        if candidates.size:
-            tau = candidates[0] + tau_min
-            return self.SAMPLE_RATE / tau
-        else:
-            return None
+        pitch = yin_pitch_frames(np.asarray(signal)[np.newaxis, :], self.SAMPLE_RATE)[0]
+        return None if np.isnan(pitch) else float(pitch)
+    #Processing Audio
+    def notes_from_peaks(self, peak_freqs, peak_amps, salience=None):
+        # Peaks arrive sorted by amplitude, loudest first. Returns (MIDI numbers, confidence)
+        return self.notes_from_peaks_batch([peak_freqs], [peak_amps],
+                                           None if salience is None else [salience])[0]
+    #Processing Audio
+    def notes_from_peaks_batch(self, peak_freqs_list, peak_amps_list, salience_list=None):
+        """(MIDI numbers, confidence) for each frame's peaks, with one harmonic grouping pass for all frames."""
+        frames = [i for i, freqs in enumerate(peak_freqs_list) if len(freqs) > 0]
+        outcomes = [(NO_NOTES, 0) for _ in peak_freqs_list]
+        if not frames:
+            return outcomes
+        frame_ids = np.repeat(frames, [len(peak_freqs_list[i]) for i in frames])
+        salience = None
+        if salience_list is not None:
+            salience = np.concatenate([salience_list[i] for i in frames])
+        fund_frames, fund_freqs, prominence = rank_fundamentals(
+            np.concatenate([peak_freqs_list[i] for i in frames]),
+            np.concatenate([peak_amps_list[i] for i in frames]),
+            frame_ids, salience)
+
+        bounds = np.searchsorted(fund_frames, np.append(frames, frames[-1] + 1))
+        for k, frame in enumerate(frames):
+            ranked = slice(bounds[k], bounds[k + 1])
+            outcomes[frame] = self.notes_from_fundamentals(fund_freqs[ranked], prominence[ranked])
+        return outcomes
     #Processing Audio
-    def process_audio(self, audio_data, sample_rate=None, is_live=True, time_position=0):
+    def notes_from_fundamentals(self, fund_freqs, prominence):
+        # One frame's fundamentals, most prominent first; the notes come back lowest first
+        confidence_score = 0
+        detected_notes, _ = frequencies_to_midi(fund_freqs[:3])
+        detected_notes = np.unique(detected_notes)
+
+        if len(fund_freqs) > 0:
+            if len(fund_freqs) <= 3:
+                confidence_score = 90
+            else:
+                top_strength = sum(p for p in prominence[:3])
+                all_strength = sum(p for p in prominence)
+                confidence_score = min(top_strength / all_strength * 100, 100)
+        return detected_notes, confidence_score
+    #Processing Audio
+    def chord_from_notes(self, detected_notes):
+        # detected_notes: MIDI numbers, lowest (the bass) first
+        if len(detected_notes) >= 2:
+            pitch_classes = detected_notes % 12
+            best_match = chord_name(pitch_class_mask(pitch_classes), pitch_classes)
+            return best_match if best_match else "Unknown chord"
+        elif len(detected_notes) == 1:
+            return f"{NOTE_NAMES[detected_notes[0] % 12]} note"
+        return "No chord detected"
+    #Processing Audio
+    def process_audio_batch(self, audio_data, sample_rate=None, chunk_samples=None, hop_samples=None,
+                            start_sample=0, filtered_audio=None):
+        """Analyze every chunk of a whole signal at once and return one file-mode result per chunk.
+
+        The signal is filtered once, framed with a zero-copy sliding window view and pushed through
+        a batched rfft; silence gating and peak picking run across all frames of a batch together.
+        """
         if sample_rate is None:
             sample_rate = self.SAMPLE_RATE
+        if chunk_samples is None:
+            chunk_samples = sample_rate
+        if hop_samples is None:
+            hop_samples = chunk_samples // 2
+        audio_data = np.asarray(audio_data, dtype=np.float64)
+        if filtered_audio is None:
+            filtered_audio = self.filter_audio(audio_data, lowcut=55, highcut=2500, fs=sample_rate)
+
+        starts = chunk_starts(len(audio_data), chunk_samples, hop_samples)
+        if len(starts) == 0:
+            return []
+        raw_frames = np.lib.stride_tricks.sliding_window_view(audio_data, chunk_samples)[::hop_samples]
+        filtered_frames = np.lib.stride_tricks.sliding_window_view(filtered_audio, chunk_samples)[::hop_samples]
+
+        plan = get_analysis_plan(chunk_samples, sample_rate, self.SPECTRUM)
+        # The gate starts over every SHARD_CHUNKS chunks counted from the start of the signal, so the
+        # results do not depend on how the signal was split into calls, as long as the splits fall
+        # on those boundaries (process_audio_stream makes sure they do)
+        gate = SpectralGate(self.GATE_TOLERANCE, self.GATE_MAX_INTERVAL) if self.SPECTRAL_GATING else None
+        first_chunk = start_sample // hop_samples
+        last_full = None  # (notes, chord, confidence) of the last fully analyzed chunk
+        results = []
+        for first in range(0, len(starts), self.BATCH_FRAMES):
+            last = min(first + self.BATCH_FRAMES, len(starts))
+            raw = raw_frames[first:last]
+            rms = np.sqrt(np.einsum('ij,ij->i', raw, raw) / chunk_samples)
+
+            magnitude = plan.magnitudes(filtered_frames[first:last])
+            noise_floor = np.percentile(magnitude, plan.NOISE_PERCENTILE, axis=1)
+            max_magnitude = magnitude.max(axis=1)
+            silent = (rms < self.NOISE_THRESHOLD) | (max_magnitude < self.NOISE_THRESHOLD * 3)
+            peak_threshold = np.maximum(noise_floor * 8, max_magnitude * 0.35)
+
+            # Chunks whose spectrum barely moved since the last analyzed one reuse its result
+            carried = np.zeros(last - first, dtype=bool)
+            if gate is not None:
+                for row in range(last - first):
+                    position = (start_sample + starts[first + row]) / sample_rate
+                    if (first_chunk + first + row) % self.SHARD_CHUNKS == 0:
+                        gate.forget()
+                    if silent[row]:
+                        gate.forget()
+                    elif gate.can_skip(magnitude[row], position):
+                        carried[row] = True
+                    else:
+                        gate.analyzed(magnitude[row], position)
+
+            # Local maxima above each frame's threshold, for all frames of the batch at once
+            centre = magnitude[:, 1:-1]
+            is_peak = (centre > magnitude[:, :-2]) & (centre > magnitude[:, 2:]) & (centre >= peak_threshold[:, np.newaxis])
+            is_peak[silent | carried] = False
+            peak_rows, peak_bins = np.nonzero(is_peak)
+            peak_bins += 1
+            bounds = np.searchsorted(peak_rows, np.arange(last - first + 1))
+
+            salience = None
+            if self.FUNDAMENTAL_RANKING == "harmonic_sum":
+                salience = plan.harmonic_salience(magnitude)
+            frame_peaks = []
+            for row in range(last - first):
+                peaks = peak_bins[bounds[row]:bounds[row + 1]]
+                peaks = select_by_distance(peaks, magnitude[row, peaks], plan.peak_distance)
+                peaks = peaks[np.argsort(magnitude[row, peaks])[::-1]]
+                frame_peaks.append(peaks[plan.in_band(peaks)])
+            # Harmonic grouping for every frame of the batch in one pass
+            outcomes = self.notes_from_peaks_batch(
+                [plan.peak_frequencies(magnitude[row], peaks) for row, peaks in enumerate(frame_peaks)],
+                [magnitude[row, peaks] for row, peaks in enumerate(frame_peaks)],
+                None if salience is None else [salience[row, peaks] for row, peaks in enumerate(frame_peaks)])
+
+            if self.CHORD_ENGINE == "chroma":
+                # Chords for the whole batch from one sparse product and one matmul
+                analyzed = ~carried
+                chroma_chords, chroma_scores = match_chords(chromagram(magnitude[analyzed], plan.chroma_matrix()))
+                chroma_rows = np.cumsum(analyzed) - 1
+
+            for row in range(last - first):
+                time_position = (start_sample + starts[first + row]) / sample_rate
+                if silent[row]:
+                    results.append({"notes": [], "midi": NO_NOTES, "chord": "No notes", "confidence": 0, "source": "file",
+                                    "time_position": time_position, "detected_at": time.strftime("%H:%M:%S")})
+                    continue
+                if carried[row]:
+                    detected_notes, chord, confidence_score = last_full
+                else:
+                    detected_notes, confidence_score = outcomes[row]
+                    if self.CHORD_ENGINE == "chroma":
+                        chroma_row = chroma_rows[row]
+                        chord, confidence_score = chroma_chords[chroma_row], float(chroma_scores[chroma_row] * 100)
+                    else:
+                        chord = self.chord_from_notes(detected_notes)
+                    last_full = detected_notes, chord, confidence_score
+                result = {
+                    "notes": midi_to_names(detected_notes),
+                    "midi": detected_notes,
+                    "chord": chord,
+                    "confidence": confidence_score,
+                    "source": "file",
+                    "time_position": time_position,
+                    "detected_at": time.strftime("%H:%M:%S"),
+                }
+                if carried[row]:
+                    result["gated"] = True
+                results.append(result)
+        return results
+    #Processing Audio
+    def process_audio_parallel(self, audio_data, sample_rate=None, chunk_samples=None, hop_samples=None, workers=None):
+        """process_audio_batch split into time shards that run in a process pool.
+
+        Each shard gets the exact filtered samples of its chunks and, with spectral gating on,
+        starts on one of the gate's reset boundaries, so the merged results are identical to a
+        serial process_audio_batch run.
+        """
+        if sample_rate is None:
+            sample_rate = self.SAMPLE_RATE
+        if chunk_samples is None:
+            chunk_samples = sample_rate
+        if hop_samples is None:
+            hop_samples = chunk_samples // 2
+        audio_data = np.asarray(audio_data, dtype=np.float64)
+        starts = chunk_starts(len(audio_data), chunk_samples, hop_samples)
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(starts) < workers * self.SHARD_CHUNKS:
+            return self.process_audio_batch(audio_data, sample_rate, chunk_samples, hop_samples)
+
+        block_samples = self.SHARD_CHUNKS * hop_samples
+        blocks = (audio_data[i:i + block_samples] for i in range(0, len(audio_data), block_samples))
+        return list(self.process_audio_stream(blocks, sample_rate, chunk_samples, hop_samples, workers))
+    #Processing Audio
+    def process_audio_stream(self, blocks, sample_rate=None, chunk_samples=None, hop_samples=None, workers=1,
+                             cancel_event=None, executor=None):
+        """Analyze a signal that arrives as consecutive blocks, yielding chunk results in time order.
+
+        Chunks are analyzed as soon as their last sample has arrived and only the samples that
+        unfinished chunks still need are kept, so memory is bounded by the block size. With more
+        than one worker, once workers * SHARD_CHUNKS chunks have been analyzed here (the same
+        minimum as process_audio_parallel), every further block becomes a shard for a process
+        pool: executor if given (see shard_executor), otherwise one started for this call.
+        With spectral gating on, chunks are handed out in whole groups of SHARD_CHUNKS, the
+        gate's reset interval, so the results match a single process_audio_batch call.
+        Setting cancel_event stops reading before the next block.
+        """
+        if sample_rate is None:
+            sample_rate = self.SAMPLE_RATE
+        if chunk_samples is None:
+            chunk_samples = sample_rate
+        if hop_samples is None:
+            hop_samples = chunk_samples // 2
+
+        # Cold start, like filtering the whole signal at once
+        stream_filter = StreamingBandpass(55, 2500, sample_rate, warm_start=False)
+        raw = np.empty(0)
+        filtered = np.empty(0)
+        buffer_start = 0  # Absolute sample index of raw[0]
+        next_start = 0    # Absolute start of the next chunk to analyze
+        # Short signals are done before a pool would even have started
+        parallel_from = workers * self.SHARD_CHUNKS * hop_samples
+        own_executor = None
+        pending = deque()
+        group = self.SHARD_CHUNKS if self.SPECTRAL_GATING else 1
+        try:
+            for block in itertools.chain(blocks, [None]):  # None: the signal has ended
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                if block is not None:
+                    block = np.asarray(block, dtype=np.float64)
+                    raw = np.concatenate((raw, block))
+                    filtered = np.concatenate((filtered, stream_filter.process(block)))
+                total = buffer_start + len(raw)
+
+                # Same grid as chunk_starts(): a chunk is ready once one sample past its end has arrived
+                ready = max((total - chunk_samples - 1 - next_start) // hop_samples + 1, 0)
+                if block is not None:
+                    # Hold back the chunks of an unfinished group until the rest of it arrives
+                    first_chunk = next_start // hop_samples
+                    ready = (first_chunk + ready) // group * group - first_chunk
+                if ready > 0:
+                    last_start = next_start + (ready - 1) * hop_samples
+                    begin, end = next_start - buffer_start, last_start + chunk_samples + 1 - buffer_start
+                    shard = (raw[begin:end], filtered[begin:end], next_start,
+                             sample_rate, chunk_samples, hop_samples, self.analysis_settings())
+                    if workers > 1 and next_start >= parallel_from:
+                        if executor is None:
+                            executor = own_executor = shard_executor(workers)
+                        pending.append(executor.submit(_analyze_shard, shard))
+                    else:
+                        yield from self.process_audio_batch(shard[0], sample_rate, chunk_samples, hop_samples,
+                                                            start_sample=next_start, filtered_audio=shard[1])
+                    next_start = last_start + hop_samples
+                    raw = raw[next_start - buffer_start:]
+                    filtered = filtered[next_start - buffer_start:]
+                    buffer_start = next_start
+
+                # Hand back finished shards in order, and stop reading ahead of a busy pool
+                while pending and (pending[0].done() or len(pending) > workers * 2):
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Do not wait for shards still running after a cancel
+            if own_executor is not None:
+                own_executor.shutdown(wait=False, cancel_futures=True)
+            for future in pending:
+                future.cancel()
+    #Processing Audio
+    def subscribe(self, callback):
+        # Callbacks run on the thread that produced the result
+        self.subscribers.append(callback)
+    #Processing Audio
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+    #Processing Audio
+    def publish(self, result):
+        for callback in self.subscribers:
+            callback(result)
+        return result
+    #Processing Audio
+    def finish_result(self, result, is_live, time_position=0, started=0.0):
+        result["source"] = "live" if is_live else "file"
+        if not is_live:
+            result["time_position"] = time_position
+            result["detected_at"] = time.strftime("%H:%M:%S")
+        profiler = self.profiler
+        t = profiler.start()
+        result = self.publish(result)
+        profiler.lap("publish", t)
+        profiler.lap("total", started)
+        return result
+    #Processing Audio
+    def process_audio(self, audio_data, sample_rate=None, is_live=True, time_position=0, filtered_audio=None):
+        # filtered_audio: the same samples already band-passed (55-2500 Hz) by the caller,
+        # as in the sliding-window live mode where every hop is filtered once on arrival
+        if sample_rate is None:
+            sample_rate = self.SAMPLE_RATE
+        profiler = self.profiler
+        started = t = profiler.start()
     
         try:
             # Convert to mono if stereo
@@ -116,173 +524,108 @@ class AudioProcessor:
     
             # Check if audio is silent using RMS
             rms = np.sqrt(np.mean(audio_data**2))
+            t = profiler.lap("rms", t)
             if rms < self.NOISE_THRESHOLD:
-                result = {"notes": [], "chord": "No notes", "confidence": 0}
-                if is_live and self.app.gui_components.result_label.winfo_exists():
-                    self.app.root.after(0, lambda: self.app.gui_components.result_label.config(text="No notes"))
-                    self.app.log_manager.add_to_log("Live Detection - No notes detected")
-                return result
+                profiler.count("silent_frames")
+                if is_live:
+                    self.live_gate.forget()
+                result = {"notes": [], "midi": NO_NOTES, "chord": "No notes", "confidence": 0}
+                return self.finish_result(result, is_live, time_position, started)
     
             # Apply more aggressive bandpass filtering to reduce subtones
-            filtered_audio = self.filter_audio(audio_data, lowcut=55, highcut=2500)
+            if filtered_audio is None:
+                filtered_audio = self.filter_audio(audio_data, lowcut=55, highcut=2500, fs=sample_rate, stream=is_live)
+                t = profiler.lap("bandpass", t)
     
             # Enhanced FFT-Based Pitch Detection
-            n = len(filtered_audio)
-            windowed_audio = filtered_audio * np.blackman(n)
-            fft_data = np.fft.rfft(windowed_audio)
-            magnitude = np.abs(fft_data)
-            freqs = np.fft.rfftfreq(n, 1/sample_rate)
+            plan = get_analysis_plan(len(filtered_audio), sample_rate, self.SPECTRUM)
+            magnitude = plan.magnitude_spectrum(filtered_audio)
+            t = profiler.lap("window_fft", t)
     
-            noise_floor = np.percentile(magnitude, 75)
+            noise_floor = np.percentile(magnitude, plan.NOISE_PERCENTILE)
             max_magnitude = np.max(magnitude)
+            t = profiler.lap("noise_floor", t)
     
             if max_magnitude < self.NOISE_THRESHOLD * 3:
-                result = {"notes": [], "chord": "No notes", "confidence": 0}
-                if is_live and self.app.gui_components.result_label.winfo_exists():
-                    self.app.root.after(0, lambda: self.app.gui_components.result_label.config(text="No notes"))
-                    self.app.log_manager.add_to_log("Live Detection - No notes detected")
-                return result
+                profiler.count("silent_frames")
+                if is_live:
+                    self.live_gate.forget()
+                result = {"notes": [], "midi": NO_NOTES, "chord": "No notes", "confidence": 0}
+                return self.finish_result(result, is_live, time_position, started)
+    
+            # Live frames whose spectrum barely moved since the last full analysis reuse its result
+            gate = self.live_gate if is_live and self.SPECTRAL_GATING else None
+            if gate is not None:
+                now = time.monotonic()
+                gate.tolerance, gate.max_interval = self.GATE_TOLERANCE, self.GATE_MAX_INTERVAL
+                skip = gate.can_skip(magnitude, now)
+                t = profiler.lap("gate", t)
+                if skip:
+                    profiler.count("gated_frames")
+                    result = dict(gate.result, gated=True)
+                    return self.finish_result(result, is_live, time_position, started)
     
             peak_threshold = max(noise_floor * 8, max_magnitude * 0.35)
-            min_peak_distance = int(30 * (n / sample_rate))
-            peaks, _ = find_peaks(magnitude, height=peak_threshold, distance=min_peak_distance)
+            peaks, _ = find_peaks(magnitude, height=peak_threshold, distance=plan.peak_distance)
+            t = profiler.lap("find_peaks", t)
     
-            detected_notes = []
+            detected_notes = NO_NOTES
             confidence_score = 0
     
             if len(peaks) > 0:
-                peak_freqs = freqs[peaks]
+                peaks = peaks[np.argsort(magnitude[peaks])[::-1]]
+                peaks = peaks[plan.in_band(peaks)]
+                peak_freqs = plan.peak_frequencies(magnitude, peaks)
                 peak_amps = magnitude[peaks]
     
-                sorted_indices = np.argsort(peak_amps)[::-1]
-                peak_freqs = peak_freqs[sorted_indices]
-                peak_amps = peak_amps[sorted_indices]
-    
-                valid_peaks = [(f, a) for f, a in zip(peak_freqs, peak_amps) if 55 <= f <= 2500]
-    
-                if valid_peaks:
-                    peak_freqs, peak_amps = zip(*valid_peaks)
-                    max_amp = peak_amps[0]
-                    norm_amps = [amp/max_amp for amp in peak_amps]
-    
-                    fundamentals = []
-                    harmonic_relations = {}
-                    harmonic_tolerance = 0.02
-    
-                    for i, freq in enumerate(peak_freqs):
-                        if norm_amps[i] < 0.15:
-                            continue
-                        is_harmonic = False
-                        for fund in fundamentals:
-                            harmonic_ratio = freq / fund
-                            if abs(harmonic_ratio - round(harmonic_ratio)) < harmonic_tolerance and harmonic_ratio > 1.2:
-                                if fund not in harmonic_relations:
-                                    harmonic_relations[fund] = []
-                                harmonic_relations[fund].append((freq, norm_amps[i], round(harmonic_ratio)))
-                                is_harmonic = True
-                                break
-                        if not is_harmonic:
-                            fundamentals.append(freq)
-    
-                    ranked_fundamentals = []
-                    for fund in fundamentals:
-                        fund_amp = next((a for f, a in zip(peak_freqs, norm_amps) if abs(f - fund) < 5), 0)
-                        harmonic_bonus = 0.3 if fund in harmonic_relations else 0
-                        prominence = fund_amp + harmonic_bonus
-                        ranked_fundamentals.append((fund, prominence))
-    
-                    ranked_fundamentals.sort(key=lambda x: x[1], reverse=True)
-                    top_fundamentals = [f for f, _ in ranked_fundamentals[:3]]
-    
-                    for freq in sorted(top_fundamentals):
-                        note = self.frequency_to_note(freq)
-                        if note and note not in detected_notes:
-                            detected_notes.append(note)
-    
-                    if ranked_fundamentals:
-                        if len(ranked_fundamentals) <= 3:
-                            confidence_score = 90
-                        else:
-                            top_strength = sum(p for _, p in ranked_fundamentals[:3])
-                            all_strength = sum(p for _, p in ranked_fundamentals)
-                            confidence_score = min(top_strength / all_strength * 100, 100)
+                if len(peaks) > 0:
+                    salience = None
+                    if self.FUNDAMENTAL_RANKING == "harmonic_sum":
+                        salience = plan.harmonic_salience(magnitude)[peaks]
+                    detected_notes, confidence_score = self.notes_from_peaks(peak_freqs, peak_amps, salience)
+                t = profiler.lap("harmonics", t)
     
                 # Use YIN fallback
                 if len(detected_notes) == 0 and is_live:
-                    yin_estimate = self.yin_pitch(filtered_audio)
+                    yin_estimate = self.yin_pitch(filtered_audio[-self.YIN_WINDOW:])
                     if yin_estimate is not None:
-                        yin_note = self.frequency_to_note(yin_estimate)
-                        detected_notes = [yin_note]
+                        detected_notes, _ = frequencies_to_midi([yin_estimate])
                         confidence_score = 70
+                    t = profiler.lap("yin", t)
     
             if is_live:
-                if not hasattr(self, 'note_history'):
-                    self.note_history = []
-                    self.detected_chords_history = []
-    
+                # Keep the notes also heard in one of the previous two frames, if any were
                 self.note_history.append(detected_notes)
-                if len(self.note_history) > 3:
-                    self.note_history.pop(0)
-    
                 if len(self.note_history) >= 2:
-                    stable_notes = []
-                    for note in detected_notes:
-                        if any(note in frame for frame in self.note_history[:-1]):
-                            stable_notes.append(note)
-                    if stable_notes:
-                        detected_notes = stable_notes
+                    stable = np.isin(detected_notes, np.concatenate(list(self.note_history)[:-1]))
+                    if stable.any():
+                        detected_notes = detected_notes[stable]
     
-            if detected_notes and len(detected_notes) >= 2:
-                base_notes = [note[:-1] if note and len(note) > 1 and note[-1].isdigit() else note for note in detected_notes]
-                chord = self.identify_chord(base_notes)
+            t = profiler.lap("note_smoothing", t)
+            chord = self.chord_from_notes(detected_notes)
+            t = profiler.lap("identify_chord", t)
+            if is_live and len(detected_notes) > 0:
+                tracker = self.chord_tracker
+                tracker.switch_penalty = self.CHORD_SWITCH_PENALTY
+                state = tracker.update(template_scores(notes_chroma(detected_notes))[0])
+                if tracker.names[state] != NO_CHORD:
+                    chord = tracker.names[state]
     
-                if is_live:
-                    self.detected_chords_history.append(chord)
-                    if len(self.detected_chords_history) > 3:
-                        self.detected_chords_history.pop(0)
-                    chord_counts = Counter(self.detected_chords_history)
-                    most_common_chord = chord_counts.most_common(1)
-                    if most_common_chord and most_common_chord[0][1] >= 2:
-                        chord = most_common_chord[0][0]
-            elif detected_notes and len(detected_notes) == 1:
-                chord = f"{detected_notes[0][:-1]} note"
-            else:
-                chord = "No chord detected"
+            profiler.lap("chord_smoothing", t)
     
             result = {
-                "notes": detected_notes,
+                "notes": midi_to_names(detected_notes),
+                "midi": detected_notes,
                 "chord": chord,
                 "confidence": confidence_score
             }
-    
-            if is_live:
-                if detected_notes:
-                    result_text = f"Notes: {', '.join(detected_notes)}\nChord: {chord}"
-                    log_text = f"Live Detection - Notes: {', '.join(detected_notes)} - Chord: {chord}"
-                else:
-                    result_text = "No notes"
-                    log_text = "Live Detection - No notes detected"
-    
-                self.app.root.after(0, lambda: self.app.gui_components.result_label.config(text=result_text))
-                self.app.log_manager.add_to_log(log_text)
-            else:
-                # File mode
-                result["time_position"] = time_position
-                result["detected_at"] = time.strftime("%H:%M:%S")
-                if detected_notes:
-                    self.app.log_manager.add_to_log(
-                        f"File Analysis at {round(time_position, 2)}s - Notes: {', '.join(detected_notes)} - Chord: {chord}"
-                    )
-                else:
-                    self.app.log_manager.add_to_log(
-                        f"File Analysis at {round(time_position, 2)}s - No notes detected"
-                    )
-    
-            return result
+            if gate is not None:
+                gate.analyzed(magnitude, now, result)
+            return self.finish_result(result, is_live, time_position, started)
     
         except Exception as e:
             print(f"Processing error: {traceback.format_exc()}")
-            if is_live:
-                self.app.root.after(0, lambda: self.app.gui_components.result_label.config(text=f"Error: {str(e)}"))
-            return {"notes": [], "chord": "Error", "confidence": 0, "error": str(e)}
+            profiler.count("errors")
+            result = {"notes": [], "midi": NO_NOTES, "chord": "Error", "confidence": 0, "error": str(e)}
+            return self.finish_result(result, is_live, time_position, started)
     
\ No newline at end of file
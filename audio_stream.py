@@ -0,0 +1,191 @@
+import os
+import struct
+import numpy as np
+import soundfile as sf
+import soxr
+
+STREAM_BLOCK = 1 << 20
+
+# (format tag, bits per sample) -> (numpy dtype without byte order, scale to [-1, 1), offset)
+WAV_SAMPLE_FORMATS = {
+    (1, 8): ('u1', 1 / 128, 128),
+    (1, 16): ('i2', 1 / 32768, 0),
+    (1, 32): ('i4', 1 / 2147483648, 0),
+    (3, 32): ('f4', 1, 0),
+    (3, 64): ('f8', 1, 0),
+}
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+AIFC_COMPRESSION = {b'NONE': '>', b'twos': '>', b'sowt': '<', b'fl32': '>', b'FL32': '>'}
+
+class PcmMapping:
+    """Sample data of an uncompressed file, memory-mapped in place as a (frames, channels) array."""
+
+    def __init__(self, path, dtype, offset, frames, channels, sample_rate, scale, zero):
+        self.sample_rate = sample_rate
+        self.scale = np.float32(scale)
+        self.zero = zero
+        if frames == 0:
+            self.samples = np.zeros((0, channels), dtype=dtype)
+        else:
+            self.samples = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(frames, channels))
+
+    def __len__(self):
+        return len(self.samples)
+
+    def read(self, start, stop):
+        """Mono float32 samples [start, stop); only this slice of the mapping is converted."""
+        block = self.samples[start:stop].astype(np.float32)
+        if self.zero:
+            block -= self.zero
+        block *= self.scale
+        return block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+
+def _wav_layout(handle, file_size):
+    riff, _, wave = struct.unpack('<4sI4s', handle.read(12))
+    if riff != b'RIFF' or wave != b'WAVE':
+        return None
+    fmt = None
+    while True:
+        header = handle.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, size = struct.unpack('<4sI', header)
+        if chunk_id == b'fmt ':
+            body = handle.read(size)
+            tag, channels, rate, _, _, bits = struct.unpack('<HHIIHH', body[:16])
+            if tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                tag = struct.unpack('<H', body[24:26])[0]
+            fmt = (tag, channels, rate, bits)
+            handle.seek(size % 2, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if fmt is None or (fmt[0], fmt[3]) not in WAV_SAMPLE_FORMATS:
+                return None
+            tag, channels, rate, bits = fmt
+            kind, scale, zero = WAV_SAMPLE_FORMATS[(tag, bits)]
+            offset = handle.tell()
+            # Writers that never finalized the header leave the size too large
+            size = min(size, file_size - offset)
+            frame_bytes = channels * bits // 8
+            return '<' + kind, offset, size // frame_bytes, channels, rate, scale, zero
+        else:
+            handle.seek(size + size % 2, os.SEEK_CUR)
+
+def _extended_to_float(raw):
+    # 80-bit IEEE extended precision, as used for the AIFF sample rate
+    exponent, mantissa = struct.unpack('>HQ', raw)
+    sign = -1 if exponent & 0x8000 else 1
+    exponent &= 0x7FFF
+    if exponent == 0 and mantissa == 0:
+        return 0.0
+    return sign * mantissa * 2.0 ** (exponent - 16383 - 63)
+
+def _aiff_layout(handle, file_size):
+    form, _, kind = struct.unpack('>4sI4s', handle.read(12))
+    if form != b'FORM' or kind not in (b'AIFF', b'AIFC'):
+        return None
+    comm = None
+    while True:
+        header = handle.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, size = struct.unpack('>4sI', header)
+        if chunk_id == b'COMM':
+            body = handle.read(size)
+            channels, frames, bits = struct.unpack('>hIh', body[:8])
+            rate = _extended_to_float(body[8:18])
+            compression = body[18:22] if kind == b'AIFC' else b'NONE'
+            comm = (channels, frames, bits, rate, compression)
+            handle.seek(size % 2, os.SEEK_CUR)
+        elif chunk_id == b'SSND':
+            if comm is None or comm[4] not in AIFC_COMPRESSION:
+                return None
+            channels, frames, bits, rate, compression = comm
+            is_float = compression in (b'fl32', b'FL32')
+            if is_float and bits != 32:
+                return None
+            formats = {16: ('i2', 1 / 32768), 32: ('f4', 1) if is_float else ('i4', 1 / 2147483648)}
+            if bits not in formats:
+                return None
+            data_offset = struct.unpack('>I', handle.read(4))[0]
+            offset = handle.tell() + 4 + data_offset
+            frames = min(frames, (file_size - offset) // (channels * bits // 8))
+            dtype, scale = formats[bits]
+            return AIFC_COMPRESSION[compression] + dtype, offset, frames, channels, rate, scale, 0
+        else:
+            handle.seek(size + size % 2, os.SEEK_CUR)
+
+def open_pcm(path):
+    """Memory-map an uncompressed PCM WAV or AIFF file, or return None for anything else."""
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as handle:
+            magic = handle.read(12)
+            handle.seek(0)
+            if magic[:4] == b'RIFF':
+                layout = _wav_layout(handle, file_size)
+            elif magic[:4] == b'FORM':
+                layout = _aiff_layout(handle, file_size)
+            else:
+                return None
+    except (OSError, struct.error):
+        return None
+    if layout is None:
+        return None
+    dtype, offset, frames, channels, rate, scale, zero = layout
+    if channels < 1 or rate <= 0 or frames < 0:
+        return None
+    return PcmMapping(path, dtype, offset, frames, channels, rate, scale, zero)
+
+def stream_audio(path, sample_rate, block_size=STREAM_BLOCK):
+    """Yield a file as consecutive mono float32 blocks at sample_rate.
+
+    Decoding and resampling are incremental, so memory use depends on block_size
+    and not on the length of the file. Formats soundfile cannot open fall back to
+    a full librosa.load that is then handed out block by block.
+
+    PCM WAV and AIFF files already at sample_rate skip decoding altogether: the
+    sample data is memory-mapped and each block is converted as it is handed out.
+    """
+    mapping = open_pcm(path)
+    if mapping is not None and mapping.sample_rate == sample_rate:
+        for start in range(0, len(mapping), block_size):
+            yield mapping.read(start, start + block_size)
+        return
+
+    try:
+        audio_file = sf.SoundFile(path)
+    except RuntimeError:
+        yield from _stream_loaded(path, sample_rate, block_size)
+        return
+
+    with audio_file:
+        resampler = None
+        if audio_file.samplerate != sample_rate:
+            resampler = soxr.ResampleStream(audio_file.samplerate, sample_rate, 1, dtype='float32')
+        while True:
+            block = audio_file.read(block_size, dtype='float32', always_2d=True)
+            last = len(block) < block_size
+            mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+            if resampler is not None:
+                mono = resampler.resample_chunk(mono, last=last)
+            if len(mono):
+                yield mono
+            if last:
+                break
+
+def stream_length(path, sample_rate):
+    """Number of samples stream_audio will produce, or None when it cannot be told up front."""
+    mapping = open_pcm(path)
+    if mapping is not None and mapping.sample_rate == sample_rate:
+        return len(mapping)
+    try:
+        info = sf.info(path)
+    except RuntimeError:
+        return None
+    return int(round(info.frames * sample_rate / info.samplerate))
+
+def _stream_loaded(path, sample_rate, block_size):
+    import librosa
+    y, _ = librosa.load(path, sr=sample_rate)
+    for start in range(0, len(y), block_size):
+        yield y[start:start + block_size]
@@ -0,0 +1,239 @@
+"""Speed and accuracy benchmarks for the analysis pipeline: python -m benchmark -o bench.json
+
+Signals come from synthetic_signals, so numbers from two runs (or two machines) are
+comparable; pass --compare with an earlier JSON file to print the differences.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+from audio_processing import AudioProcessor
+from chord_table import NOTE_NAMES, frequencies_to_midi
+from chord_tracking import ChordTracker, template_scores
+from file_analysis import FileAnalyzer
+import synthetic_signals as synth
+
+SAMPLE_RATE = 44100
+LIVE_SIZES = (1024, 4096)
+FILE_SIZE = SAMPLE_RATE  # FileAnalyzer's default one-second chunk
+
+def measure(fn, inputs, min_time=0.2, min_rounds=3):
+    """Call fn on every input, repeating rounds until min_time has passed; per-call stats in microseconds."""
+    rounds = []
+    deadline = time.perf_counter() + min_time
+    while len(rounds) < min_rounds or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        rounds.append((time.perf_counter() - started) / len(inputs))
+    rounds = np.array(rounds)
+    return {
+        "per_call_us": float(np.median(rounds) * 1e6),
+        "best_us": float(rounds.min() * 1e6),
+        "calls_per_s": float(1 / np.median(rounds)),
+        "rounds": len(rounds),
+    }
+
+def bench_throughput(min_time):
+    results = {}
+    rng = np.random.default_rng(1)
+    processor = AudioProcessor()
+    chord = synth.notes_signal(synth.chord_midis("C", "Major"), 2.0, SAMPLE_RATE, rng=rng)
+    chord = synth.add_noise(chord, 30, rng)
+
+    for size in (1024, 2048, 4096):
+        frame = synth.tone(220.0, size / SAMPLE_RATE, SAMPLE_RATE, synth.STRING_HARMONICS)
+        results[f"yin_pitch/{size}"] = measure(processor.yin_pitch, [frame], min_time)
+
+    note_lists = [[NOTE_NAMES[i] for i in rng.choice(12, size=rng.integers(2, 6), replace=False)]
+                  for _ in range(500)]
+    results["identify_chord"] = measure(processor.identify_chord, note_lists, min_time)
+
+    frequencies = list(rng.uniform(40, 3000, 1000))
+    results["frequency_to_note"] = measure(processor.frequency_to_note, frequencies, min_time)
+    # The whole batch in one call; per_call_us is per 1000 frequencies
+    results["frequencies_to_midi/1000"] = measure(frequencies_to_midi, [np.array(frequencies)], min_time)
+
+    # One hour of one-second chunks at the default 50% overlap
+    scores = template_scores(rng.random((7200, 12)))
+    results["chord_viterbi/7200"] = measure(ChordTracker().viterbi, [scores], min_time)
+
+    for size, is_live in [(size, True) for size in LIVE_SIZES] + [(FILE_SIZE, False)]:
+        frames = [chord[start:start + size] for start in range(0, len(chord) - size, size)][:16]
+        live_processor = AudioProcessor()
+        stats = measure(lambda frame: live_processor.process_audio(frame, is_live=is_live), frames, min_time)
+        stats["realtime_factor"] = size / SAMPLE_RATE / (stats["per_call_us"] / 1e6)
+        results[f"process_audio/{'live' if is_live else 'file'}/{size}"] = stats
+    return results
+
+def chord_at(timeline, position):
+    for start, end, name in timeline:
+        if start <= position < end:
+            return name
+    return None
+
+def bench_file_analysis(seconds_per_chord=2.0, repeats=4):
+    """Real-time factor of whole-file analysis, plus chord accuracy against the known progression."""
+    signal, timeline = synth.chord_sequence(seconds_per_chord, repeats, SAMPLE_RATE)
+    duration = len(signal) / SAMPLE_RATE
+    results = {"audio_seconds": duration}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "progression.wav")
+        synth.write_wav(path, signal, SAMPLE_RATE)
+        parallel = max(os.cpu_count() or 1, 2)
+        runs = [(f"workers/{workers}", workers, False) for workers in sorted({1, os.cpu_count() or 1})]
+        runs.append(("gated/workers/1", 1, True))  # Spectral gating: CPU saved against accuracy
+        runs.append((f"gated/workers/{parallel}", parallel, True))  # Must give the serial results
+        for name, workers, gating in runs:
+            analyzer = FileAnalyzer(sample_rate=SAMPLE_RATE, workers=workers)
+            analyzer.processor.SPECTRAL_GATING = gating
+            started = time.perf_counter()
+            summary = analyzer.analyze(path)
+            elapsed = time.perf_counter() - started
+            scored = correct = 0
+            chunks = summary["timeline"]
+            for start, chord in zip(chunks.times, chunks.chord_names()):
+                # Only chunks lying entirely inside one chord are scored
+                expected = chord_at(timeline, start)
+                if expected is None or expected != chord_at(timeline, start + analyzer.chunk_length - 1e-6):
+                    continue
+                scored += 1
+                correct += chord == expected
+            results[name] = {
+                "elapsed_s": elapsed,
+                "realtime_factor": duration / elapsed,
+                "chord_accuracy": correct / scored if scored else None,
+                "scored_chunks": scored,
+            }
+            if gating:
+                results[name]["gated_chunks"] = summary["gated_chunks"]
+            if gating and workers == 1:
+                serial = chunks
+            elif gating:
+                results[name]["matches_serial"] = bool(np.array_equal(chunks.rows, serial.rows)
+                                                       and chunks.chords == serial.chords)
+    return results
+
+def score_case(case, result):
+    expected_notes = set(case["notes"])
+    detected_notes = set(result["notes"])
+    expected_classes = {midi % 12 for midi in case["midis"]}
+    detected_classes = {NOTE_NAMES.index(note.rstrip("-0123456789")) for note in detected_notes}
+    return {
+        "exact_notes_found": len(expected_notes & detected_notes),
+        "pitch_classes_found": len(expected_classes & detected_classes),
+        "pitch_classes_expected": len(expected_classes),
+        "pitch_classes_detected": len(detected_classes),
+        "false_pitch_classes": len(detected_classes - expected_classes),
+        "chord_correct": None if case["chord"] is None else result["chord"] == case["chord"],
+    }
+
+def bench_accuracy(sizes=(4096, FILE_SIZE)):
+    cases = synth.accuracy_cases(duration=1.0, sample_rate=SAMPLE_RATE)
+    results = {}
+    for size in sizes:
+        totals = {"notes_expected": 0, "exact_notes_found": 0, "pitch_classes_expected": 0,
+                  "pitch_classes_found": 0, "pitch_classes_detected": 0, "false_pitch_classes": 0,
+                  "chords_scored": 0, "chords_correct": 0}
+        failures = []
+        for case in cases:
+            result = AudioProcessor().process_audio(case["signal"][:size], is_live=False)
+            score = score_case(case, result)
+            totals["notes_expected"] += len(case["notes"])
+            for key in ("exact_notes_found", "pitch_classes_expected", "pitch_classes_found",
+                        "pitch_classes_detected", "false_pitch_classes"):
+                totals[key] += score[key]
+            if score["chord_correct"] is not None:
+                totals["chords_scored"] += 1
+                totals["chords_correct"] += score["chord_correct"]
+                if not score["chord_correct"]:
+                    failures.append({"case": case["name"], "expected": case["chord"],
+                                     "got": result["chord"], "notes": result["notes"]})
+        results[f"frame/{size}"] = {
+            "note_recall": totals["exact_notes_found"] / totals["notes_expected"],
+            "pitch_class_recall": totals["pitch_classes_found"] / totals["pitch_classes_expected"],
+            "pitch_class_precision": (1 - totals["false_pitch_classes"] / totals["pitch_classes_detected"]
+                                      if totals["pitch_classes_detected"] else None),
+            "chord_accuracy": totals["chords_correct"] / totals["chords_scored"],
+            "cases": len(cases),
+            "chord_failures": failures,
+        }
+    return results
+
+def run(quick=False):
+    min_time = 0.05 if quick else 0.5
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": quick,
+        },
+        "throughput": bench_throughput(min_time),
+        "file_analysis": bench_file_analysis(repeats=1 if quick else 4),
+        "accuracy": bench_accuracy(),
+    }
+
+def flatten(report, prefix=""):
+    """Numeric leaves as {"section/name/metric": value}, the form --compare works on."""
+    values = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, name + "/"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+def compare(previous, current):
+    old, new = flatten(previous), flatten(current)
+    lines = []
+    for name in sorted(set(old) & set(new)):
+        if name.startswith("meta/") or name.endswith("/rounds"):
+            continue
+        before, after = old[name], new[name]
+        change = f"{(after / before - 1) * 100:+7.1f}%" if before else "       "
+        lines.append(f"{name:<52}{before:>14.4f}{after:>14.4f}  {change}")
+    return "\n".join(lines)
+
+def print_report(report):
+    for name, stats in report["throughput"].items():
+        line = f"{name:<28}{stats['per_call_us']:>12.2f} us/call{stats['calls_per_s']:>14.0f} calls/s"
+        if "realtime_factor" in stats:
+            line += f"{stats['realtime_factor']:>10.1f}x real time"
+        print(line)
+    for name, stats in report["file_analysis"].items():
+        if isinstance(stats, dict):
+            print(f"file analysis {name:<14}{stats['realtime_factor']:>10.1f}x real time, "
+                  f"chord accuracy {stats['chord_accuracy']:.1%}")
+    for name, stats in report["accuracy"].items():
+        print(f"accuracy {name:<19}notes {stats['note_recall']:.1%}  pitch classes {stats['pitch_class_recall']:.1%}"
+              f"  chords {stats['chord_accuracy']:.1%}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="write the full report as JSON")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    parser.add_argument("--quick", action="store_true", help="shorter timing loops and a shorter file")
+    args = parser.parse_args(argv)
+
+    report = run(quick=args.quick)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print()
+            print(compare(json.load(f), report))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import numpy as np
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+NOTE_VALUES = {name: value for value, name in enumerate(NOTE_NAMES)}
+# Name of every MIDI note number, octave from the rounded number so C4 is 60 whatever its tuning
+MIDI_NOTE_NAMES = [f"{NOTE_NAMES[midi % 12]}{midi // 12 - 1}" for midi in range(128)]
+
+def frequencies_to_midi(frequencies):
+    """Nearest MIDI note numbers (int16) and the offsets from them in cents, for any array of frequencies.
+
+    Frequencies that are not positive get note -1 and NaN cents.
+    """
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        note_numbers = 12 * np.log2(frequencies / 440.0) + 69
+    valid = frequencies > 0
+    midi = np.where(valid, np.rint(np.where(valid, note_numbers, 0)), -1).astype(np.int16)
+    cents = np.where(valid, (note_numbers - midi) * 100, np.nan)
+    return midi, cents
+
+def midi_to_names(midis):
+    return [MIDI_NOTE_NAMES[midi] for midi in midis]
+
+# Order matters: on equal scores the earlier chord type wins, as in the original dict
+CHORD_TYPES = [
+    ('Major', [0, 4, 7]),
+    ('Minor', [0, 3, 7]),
+    ('Diminished', [0, 3, 6]),
+    ('Augmented', [0, 4, 8]),
+    ('Sus2', [0, 2, 7]),
+    ('Sus4', [0, 5, 7]),
+    ('7', [0, 4, 7, 10]),
+    ('Maj7', [0, 4, 7, 11]),
+    ('m7', [0, 3, 7, 10]),
+    ('m7b5', [0, 3, 6, 10]),
+    ('6', [0, 4, 7, 9]),
+    ('m6', [0, 3, 7, 9]),
+    ('add9', [0, 2, 4, 7]),
+    ('madd9', [0, 2, 3, 7]),
+    ('9', [0, 2, 4, 7, 10]),
+    ('Maj9', [0, 2, 4, 7, 11]),
+    ('m9', [0, 2, 3, 7, 10]),
+    ('11', [0, 2, 4, 5, 7, 10]),
+    ('m11', [0, 2, 3, 5, 7, 10]),
+    ('13', [0, 2, 4, 7, 9, 10]),
+]
+CHORD_NAMES = [name for name, _ in CHORD_TYPES]
+
+def pitch_class_mask(pitch_classes):
+    mask = 0
+    for pitch_class in pitch_classes:
+        mask |= 1 << (pitch_class % 12)
+    return mask
+
+def _build_tables():
+    """Best chord type and its score for every 12-bit pitch class set and every root.
+
+    Scoring is the one identify_chord always used: 70% pattern coverage plus 30% chord
+    coverage, pattern coverage of at least 0.7, and the root must be one of the notes.
+    On equal scores the earlier chord type wins. Ties between roots depend on the order
+    of the notes, so they are left to lookup_chord.
+    """
+    masks = np.arange(4096)
+    popcount = np.array([bin(mask).count('1') for mask in masks])
+    templates = np.array([pitch_class_mask(pattern) for _, pattern in CHORD_TYPES])
+    template_sizes = popcount[templates]
+
+    roots = np.arange(12)
+    # Notes relative to each candidate root: rotate the mask right by the root
+    rotated = ((masks[:, None] >> roots) | (masks[:, None] << (12 - roots))) & 0xFFF
+    common = popcount[rotated[:, :, None] & templates]
+    note_count = np.maximum(popcount[masks], 1)[:, None, None]
+    pattern_coverage = common / template_sizes
+    score = pattern_coverage * 0.7 + (common / note_count) * 0.3
+    valid = (pattern_coverage >= 0.7) & ((masks[:, None] >> roots) & 1).astype(bool)[:, :, None]
+    score = np.where(valid, score, 0.0)
+
+    best_type = score.argmax(axis=2).astype(np.int8)
+    best_score = score.max(axis=2)
+    best_type[best_score == 0] = -1
+    return best_type, best_score
+
+# (4096 masks, 12 roots)
+ROOT_CHORD_TYPE, ROOT_CHORD_SCORE = _build_tables()
+
+def lookup_chord(mask, pitch_classes):
+    """(root, chord type index, score) for a pitch class mask, or None.
+
+    pitch_classes are the notes in the order identify_chord received them, lowest first;
+    on equal scores the root that comes first among them wins, as in the original scan.
+    """
+    scores = ROOT_CHORD_SCORE[mask, pitch_classes]
+    best = scores.argmax()
+    if scores[best] == 0:
+        return None
+    root = int(pitch_classes[best])
+    return root, int(ROOT_CHORD_TYPE[mask, root]), float(scores[best])
+
+def chord_name(mask, pitch_classes, slash=False):
+    match = lookup_chord(mask, pitch_classes)
+    if match is None:
+        return None
+    root, chord_type, _ = match
+    name = f"{NOTE_NAMES[root]} {CHORD_NAMES[chord_type]}"
+    bass = pitch_classes[0]
+    if slash and bass != root:
+        name += f"/{NOTE_NAMES[bass]}"
+    return name
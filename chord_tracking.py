@@ -0,0 +1,110 @@
+"""Chord tracking with a hidden Markov model over the chord template vocabulary.
+
+The states are chroma's templates (every single note, every chord type on every root)
+plus a no-chord state. A frame's observation is its cosine similarity to each template,
+and its emission log-likelihood is CONCENTRATION times that similarity. Staying on a
+chord is free, while moving to any other state costs the same switch penalty. Each step
+therefore needs only the best previous state, not a K x K transition product: Viterbi
+over a whole file and the live forward filter are both O(K) per frame.
+"""
+
+import numpy as np
+from chroma import MIN_CHORD_SCORE, TEMPLATE_NAMES, TEMPLATES, note_profile
+
+NO_CHORD = "No chord detected"
+SWITCH_PENALTY = 5.0   # Log-odds against changing state between two consecutive frames
+CONCENTRATION = 10.0   # Emission log-likelihood per unit of cosine similarity
+
+NOTE_PROFILES = np.array([note_profile(pitch_class) for pitch_class in range(12)])
+
+def notes_chroma(midi):
+    """(frames, 12) unit chroma expected from rows of MIDI numbers (-1 = no note)."""
+    midi = np.atleast_2d(midi)
+    present = np.zeros((len(midi), 12))
+    rows, columns = np.nonzero(midi >= 0)
+    present[rows, midi[rows, columns] % 12] = 1
+    chroma = present @ NOTE_PROFILES
+    norms = np.linalg.norm(chroma, axis=1, keepdims=True)
+    return np.divide(chroma, norms, out=np.zeros_like(chroma), where=norms > 0)
+
+def template_scores(chroma):
+    """(frames, K) similarity of every chroma frame to every state; no-chord is MIN_CHORD_SCORE."""
+    chroma = np.atleast_2d(chroma)
+    scores = np.empty((len(chroma), len(TEMPLATES) + 1))
+    scores[:, :-1] = chroma @ TEMPLATES.T
+    scores[:, -1] = MIN_CHORD_SCORE
+    return scores
+
+class ChordTracker:
+    """Viterbi decoding for whole sequences and a forward filter for live frames."""
+
+    def __init__(self, switch_penalty=SWITCH_PENALTY, concentration=CONCENTRATION):
+        self.names = TEMPLATE_NAMES + [NO_CHORD]
+        self.switch_penalty = switch_penalty
+        self.concentration = concentration
+        self.reset()
+
+    def reset(self):
+        self.posterior = None
+
+    def viterbi(self, scores):
+        """Most likely state index for every row of a (frames, K) template_scores matrix."""
+        log_emissions = self.concentration * np.asarray(scores, dtype=np.float64)
+        frames = len(log_emissions)
+        if frames == 0:
+            return np.empty(0, dtype=np.intp)
+        # switched[t, j]: the best path into j at t came from best_previous[t], not from j itself
+        switched = np.empty(log_emissions.shape, dtype=bool)
+        best_previous = np.empty(frames, dtype=np.intp)
+        delta = log_emissions[0].copy()
+        penalty = self.switch_penalty
+        for t in range(1, frames):
+            best = delta.argmax()
+            best_previous[t] = best
+            threshold = delta[best] - penalty
+            np.less(delta, threshold, out=switched[t])
+            np.maximum(delta, threshold, out=delta)
+            delta += log_emissions[t]
+
+        path = np.empty(frames, dtype=np.intp)
+        state = delta.argmax()
+        for t in range(frames - 1, 0, -1):
+            path[t] = state
+            if switched[t, state]:
+                state = best_previous[t]
+        path[0] = state
+        return path
+
+    def decode(self, scores):
+        return [self.names[state] for state in self.viterbi(scores)]
+
+    def update(self, scores):
+        """Advance the forward filter by one frame of template scores; returns the most likely state."""
+        scores = np.asarray(scores, dtype=np.float64)
+        likelihood = np.exp(self.concentration * (scores - scores.max()))
+        if self.posterior is None:
+            posterior = likelihood
+        else:
+            # Stay with weight 1, move to each other state with weight exp(-penalty)
+            switch = np.exp(-self.switch_penalty)
+            posterior = (self.posterior + switch * (1 - self.posterior)) * likelihood
+        self.posterior = posterior / posterior.sum()
+        return int(self.posterior.argmax())
+
+def smooth_timeline_chords(timeline, tracker):
+    """Relabel a ResultTimeline's chords with the Viterbi path over its notes.
+
+    Rows whose best state is no-chord keep the chord named from their notes.
+    """
+    if len(timeline) == 0:
+        return timeline
+    path = tracker.viterbi(template_scores(notes_chroma(timeline.rows["midi"])))
+    chords = timeline.rows["chord"]
+    no_chord = len(tracker.names) - 1
+    state_ids = {}
+    for row, state in enumerate(path):
+        if state != no_chord:
+            if state not in state_ids:
+                state_ids[state] = timeline.chord_id(tracker.names[state])
+            chords[row] = state_ids[state]
+    return timeline
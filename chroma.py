@@ -0,0 +1,66 @@
+"""Chromagram and chord template matching for batches of magnitude spectra.
+
+A (12, bins) sparse matrix folds every in-band spectrum bin onto its nearest pitch class, so
+a whole batch of spectra becomes chroma with one sparse product; every frame is then
+scored against every chord template with one dense matmul.
+"""
+
+from functools import lru_cache
+import numpy as np
+from scipy import sparse
+from chord_table import NOTE_NAMES, CHORD_TYPES
+
+# Partials 1-4 of a note land on its own pitch class, except the 3rd (a fifth up)
+HARMONIC_PITCH_OFFSETS = (0, 0, 7, 0)
+HARMONIC_DECAY = 0.6
+MIN_CHORD_SCORE = 0.5  # Cosine similarity below which a frame gets no chord
+
+@lru_cache(maxsize=8)
+def chroma_matrix(n, sample_rate, low_freq=55, high_freq=2500):
+    """Sparse (12, n // 2 + 1) map from rfft bins to pitch classes, built once per frame length and rate."""
+    freqs = np.fft.rfftfreq(n, 1 / sample_rate)
+    bins = np.flatnonzero((freqs >= low_freq) & (freqs <= high_freq))
+    pitch_classes = np.round(12 * np.log2(freqs[bins] / 440.0) + 69).astype(int) % 12
+    return sparse.csr_matrix((np.ones(len(bins)), (pitch_classes, bins)), shape=(12, len(freqs)))
+
+def note_profile(pitch_class):
+    """Expected chroma of one harmonic note."""
+    profile = np.zeros(12)
+    for h, offset in enumerate(HARMONIC_PITCH_OFFSETS):
+        profile[(pitch_class + offset) % 12] += HARMONIC_DECAY ** h
+    return profile
+
+def _build_templates():
+    """Unit-length templates for single notes and every chord type on every root, and their names."""
+    templates, names = [], []
+    for root in range(12):
+        templates.append(note_profile(root))
+        names.append(f"{NOTE_NAMES[root]} note")
+    for chord_type, pattern in CHORD_TYPES:
+        for root in range(12):
+            templates.append(sum(note_profile(root + interval) for interval in pattern))
+            names.append(f"{NOTE_NAMES[root]} {chord_type}")
+    templates = np.array(templates)
+    return templates / np.linalg.norm(templates, axis=1, keepdims=True), names
+
+TEMPLATES, TEMPLATE_NAMES = _build_templates()
+
+def chromagram(magnitude, pitch_class_map):
+    """(frames, 12) unit-length chroma of a (frames, bins) batch of magnitudes.
+
+    pitch_class_map is the spectrum's (12, bins) fold, e.g. chroma_matrix(n, sample_rate)
+    for rfft bins or an analysis plan's chroma_matrix().
+    """
+    magnitude = np.atleast_2d(magnitude)
+    chroma = np.asarray((pitch_class_map @ magnitude.T).T)
+    norms = np.linalg.norm(chroma, axis=1, keepdims=True)
+    return np.divide(chroma, norms, out=np.zeros_like(chroma), where=norms > 0)
+
+def match_chords(chroma):
+    """Best template for every chroma frame: (names, cosine scores)."""
+    scores = chroma @ TEMPLATES.T
+    best = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(best)), best]
+    names = [TEMPLATE_NAMES[index] if score >= MIN_CHORD_SCORE else "No chord detected"
+             for index, score in zip(best, best_scores)]
+    return names, best_scores
@@ -0,0 +1,98 @@
+"""Constant-Q spectrum: log-spaced bins, BINS_PER_OCTAVE per octave, from one FFT per frame.
+
+Each bin's kernel is a windowed complex sinusoid Q periods long. The kernels are moved to
+the frequency domain once per (frame length, sample rate), thresholded into a sparse
+matrix, and every frame afterwards costs one rfft plus one sparse product.
+
+A kernel can never be longer than the frame, so low bins only reach their full Q when
+the frame is long enough: 55 Hz at 36 bins per octave wants about 41000 samples at
+44.1 kHz. Short live blocks get log spacing but bass bins as wide as the block allows;
+to separate low notes at live latency, pair this spectrum with the sliding-window live
+mode (a window of 8192 samples or more, with a small hop).
+"""
+
+import threading
+import numpy as np
+from scipy import sparse
+
+BINS_PER_OCTAVE = 36
+KERNEL_THRESHOLD = 0.0054  # Spectral kernel entries below this fraction of their peak are dropped
+
+class ConstantQPlan:
+    """Drop-in alternative to AnalysisPlan whose bins are constant-Q instead of linear."""
+
+    # Every bin is in the musical band, and a chord's partials light up far more than a
+    # quarter of them, so the noise floor comes from the quietest bins
+    NOISE_PERCENTILE = 25
+
+    def __init__(self, n, sample_rate, low_freq=55, high_freq=2500, bins_per_octave=BINS_PER_OCTAVE):
+        self.n = n
+        self.sample_rate = sample_rate
+        self.bins_per_octave = bins_per_octave
+        n_bins = int(np.floor(bins_per_octave * np.log2(high_freq / low_freq))) + 1
+        self.freqs = low_freq * 2.0 ** (np.arange(n_bins) / bins_per_octave)
+        self.band = slice(0, n_bins)
+        self.peak_distance = max(bins_per_octave // 12, 1)  # One semitone
+        self.Q = 1 / (2 ** (1 / bins_per_octave) - 1)
+        self.lengths = np.minimum(np.ceil(self.Q * sample_rate / self.freqs), n).astype(int)
+        self.kernel = self._spectral_kernel()
+        self._chroma = None
+        self._lock = threading.Lock()
+
+    def _spectral_kernel(self):
+        # Kernels end at the frame's last sample, so high bins react to the newest audio.
+        # Scaled so a sinusoid peaks at the same height as in the Blackman-windowed rfft,
+        # which keeps process_audio's thresholds meaningful for both spectra.
+        scale = np.blackman(self.n).sum()
+        rows = []
+        for freq, length in zip(self.freqs, self.lengths):
+            window = np.hanning(length)
+            t = np.arange(length)
+            temporal = np.zeros(self.n, dtype=complex)
+            temporal[self.n - length:] = window / window.sum() * np.exp(2j * np.pi * freq * t / self.sample_rate)
+            spectral = np.conj(np.fft.rfft(temporal.real) + 1j * np.fft.rfft(temporal.imag)) / self.n
+            spectral[np.abs(spectral) < KERNEL_THRESHOLD * np.abs(spectral).max()] = 0
+            rows.append(sparse.csr_matrix(spectral * scale))
+        # Only the rfft half is kept: each kernel's energy sits at +freq, so the negative
+        # half contributes next to nothing. A unit sinusoid then measures 1/2, as in the rfft.
+        return sparse.vstack(rows).tocsr()
+
+    def magnitudes(self, frames):
+        """Constant-Q magnitudes of one frame or a (frames, n) batch."""
+        spectrum = np.fft.rfft(frames, axis=-1)
+        return np.abs(np.asarray(self.kernel @ spectrum.T).T)
+
+    def magnitude_spectrum(self, frame):
+        return self.magnitudes(frame)
+
+    def harmonic_salience(self, magnitude, harmonics=5, decay=0.8):
+        """harmonic_sum_spectrum for log-spaced bins: harmonic h sits bins_per_octave * log2(h) bins up."""
+        magnitude = np.asarray(magnitude, dtype=np.float64)
+        salience = magnitude.copy()
+        for h in range(2, harmonics + 1):
+            shift = int(round(self.bins_per_octave * np.log2(h)))
+            if shift < magnitude.shape[-1]:
+                salience[..., :-shift] += decay ** (h - 1) * magnitude[..., shift:]
+        return salience
+
+    def in_band(self, bins):
+        return (bins >= self.band.start) & (bins < self.band.stop)
+
+    def peak_frequencies(self, magnitude, peaks):
+        """Peak frequencies refined between bins by a parabola through the log magnitudes."""
+        inner = (peaks > 0) & (peaks < len(magnitude) - 1)
+        offset = np.zeros(len(peaks))
+        k = peaks[inner]
+        left, centre, right = (np.log(magnitude[k + d] + 1e-12) for d in (-1, 0, 1))
+        curvature = left - 2 * centre + right
+        offset[inner] = np.where(curvature < 0, 0.5 * (left - right) / np.where(curvature < 0, curvature, 1), 0)
+        return self.freqs[0] * 2.0 ** ((peaks + offset) / self.bins_per_octave)
+
+    def chroma_matrix(self):
+        with self._lock:
+            if self._chroma is None:
+                bins = np.arange(len(self.freqs))
+                pitch_classes = np.round(12 * np.log2(self.freqs / 440.0) + 69).astype(int) % 12
+                self._chroma = sparse.csr_matrix((np.ones(len(bins)), (pitch_classes, bins)),
+                                                 shape=(12, len(self.freqs)))
+            return self._chroma
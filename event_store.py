@@ -0,0 +1,170 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+DEFAULT_EVENTS_PATH = os.path.join(os.path.expanduser("~"), ".local", "share", "andra_portabila", "events.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    source_file TEXT,
+    started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    source TEXT NOT NULL,
+    source_file TEXT,
+    time_position REAL NOT NULL,
+    detected_at REAL NOT NULL,
+    notes TEXT NOT NULL,
+    chord TEXT,
+    confidence REAL
+);
+CREATE INDEX IF NOT EXISTS events_session_time ON events (session_id, time_position);
+CREATE INDEX IF NOT EXISTS events_file_time ON events (source_file, time_position);
+CREATE INDEX IF NOT EXISTS events_detected_at ON events (detected_at);
+CREATE INDEX IF NOT EXISTS events_chord_time ON events (chord, detected_at);
+"""
+
+EVENT_COLUMNS = ("session_id", "source", "source_file", "time_position", "detected_at", "notes", "chord", "confidence")
+
+class EventStore:
+    """Append-only SQLite log of every detection event, written by a background thread.
+
+    record() only puts a row on a queue, so it is safe to call from the audio and
+    analysis threads. The writer commits rows in batches of up to BATCH_SIZE, or
+    whatever has arrived after FLUSH_INTERVAL seconds. The writer is a daemon thread,
+    so call close() before exiting or the rows still queued are lost. Queries open
+    their own connection, which WAL mode lets run alongside the writer.
+    """
+
+    BATCH_SIZE = 500
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, path=DEFAULT_EVENTS_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self.active = {}  # source ("live" / "file") -> (session id, source file, session start)
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="event-store-writer", daemon=True)
+        self._writer.start()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start_session(self, kind, source_file=None):
+        """Open a session; results of that source published afterwards are recorded under it."""
+        started = time.time()
+        with closing(self.connect()) as conn, conn:
+            session_id = conn.execute("INSERT INTO sessions (kind, source_file, started) VALUES (?, ?, ?)",
+                                      (kind, source_file, started)).lastrowid
+        self.active[kind] = (session_id, source_file, started)
+        return session_id
+
+    def end_session(self, kind):
+        self.active.pop(kind, None)
+
+    def record(self, result):
+        """AudioProcessor subscriber. Silent and failed results are not events."""
+        if result["chord"] in ("No notes", "Error") or not result["notes"]:
+            return
+        source = result.get("source", "live")
+        session = self.active.get(source)
+        if session is None:
+            return
+        session_id, source_file, started = session
+        now = time.time()
+        time_position = result["time_position"] if source == "file" else now - started
+        self._queue.put((session_id, source, source_file, time_position, now,
+                         ",".join(result["notes"]), result["chord"], result.get("confidence")))
+
+    def flush(self, timeout=None):
+        """Block until everything recorded so far is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Commit everything recorded so far and stop the writer; later results are not recorded."""
+        self.active.clear()
+        self._queue.put(None)
+        self._writer.join(timeout)
+        return not self._writer.is_alive()
+
+    def _write_loop(self):
+        conn = self.connect()
+        stopping = False
+        while not stopping:
+            batch, markers = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while True:
+                if item is None:  # close()
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    markers.append(item)
+                    break  # A flush() is waiting, commit now
+                batch.append(item)
+                if len(batch) >= self.BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(f"INSERT INTO events ({', '.join(EVENT_COLUMNS)}) "
+                                         f"VALUES ({', '.join('?' * len(EVENT_COLUMNS))})", batch)
+                except sqlite3.Error as e:
+                    print(f"Could not store {len(batch)} detection events: {e}")
+            for marker in markers:
+                marker.set()
+        conn.close()
+
+    def _query(self, sql, params=()):
+        with closing(self.connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def events_between(self, start, end, session_id=None, source_file=None):
+        """Events detected between two epoch times, or, given a session or file, between two positions in it."""
+        if session_id is not None:
+            return self._query("SELECT * FROM events WHERE session_id = ? AND time_position BETWEEN ? AND ? "
+                               "ORDER BY time_position", (session_id, start, end))
+        if source_file is not None:
+            return self._query("SELECT * FROM events WHERE source_file = ? AND time_position BETWEEN ? AND ? "
+                               "ORDER BY time_position", (source_file, start, end))
+        return self._query("SELECT * FROM events WHERE detected_at BETWEEN ? AND ? ORDER BY detected_at",
+                           (start, end))
+
+    def events_with_chord(self, chord, start=None, end=None, limit=None):
+        """Most recent first."""
+        sql = "SELECT * FROM events WHERE chord = ? AND detected_at BETWEEN ? AND ? ORDER BY detected_at DESC"
+        params = [chord, start if start is not None else 0, end if end is not None else time.time() + 1]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, params)
+
+    def chord_counts(self, session_id):
+        rows = self._query("SELECT chord, COUNT(*) AS n FROM events WHERE session_id = ? GROUP BY chord "
+                           "ORDER BY n DESC", (session_id,))
+        return {row["chord"]: row["n"] for row in rows}
+
+    def sessions(self, kind=None, limit=100):
+        if kind is None:
+            return self._query("SELECT * FROM sessions ORDER BY started DESC LIMIT ?", (limit,))
+        return self._query("SELECT * FROM sessions WHERE kind = ? ORDER BY started DESC LIMIT ?", (kind, limit))
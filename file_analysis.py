@@ -0,0 +1,110 @@
+import os
+from audio_processing import AudioProcessor
+from audio_stream import stream_audio, stream_length
+from timeline import ResultTimeline
+from chord_tracking import ChordTracker, smooth_timeline_chords
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg', '.aif', '.aiff')
+
+# Bump whenever a code change alters analysis output, so cached results are not reused
+ANALYSIS_VERSION = 3
+
+class AnalysisCancelled(Exception):
+    pass
+
+class FileAnalyzer:
+    """Whole-file analysis on top of AudioProcessor, with no GUI dependencies."""
+
+    def __init__(self, processor=None, sample_rate=44100, chunk_length=1, overlap=0.5, workers=1, cache=None,
+                 executor=None):
+        self.processor = processor if processor is not None else AudioProcessor()
+        self.sample_rate = sample_rate
+        self.chunk_length = chunk_length  # seconds
+        self.overlap = overlap
+        self.workers = workers
+        self.cache = cache
+        # Process pool shared by every file analyzed (audio_processing.shard_executor); the caller shuts it down
+        self.executor = executor
+
+    def cache_params(self):
+        return {
+            "version": ANALYSIS_VERSION,
+            "sample_rate": self.sample_rate,
+            "chunk_length": self.chunk_length,
+            "overlap": self.overlap,
+            "settings": self.processor.analysis_settings(),
+        }
+
+    def iter_results(self, path, progress=None, cancel_event=None):
+        """Yield every chunk result of a file in time order, publishing the non-silent ones.
+
+        progress(processed_samples, total_samples) is called after every chunk; total_samples
+        is None when the length is unknown. Setting cancel_event raises AnalysisCancelled
+        before the next chunk is handed out.
+        """
+        chunk_samples = int(self.chunk_length * self.sample_rate)
+        hop_samples = int(self.overlap * chunk_samples)
+        total_samples = stream_length(path, self.sample_rate) if progress else None
+        blocks = stream_audio(path, self.sample_rate)
+        results = self.processor.process_audio_stream(blocks, self.sample_rate, chunk_samples,
+                                                      hop_samples, workers=self.workers,
+                                                      cancel_event=cancel_event, executor=self.executor)
+        for result in results:
+            if cancel_event is not None and cancel_event.is_set():
+                raise AnalysisCancelled(path)
+            if result["chord"] != "No notes":  # Silent chunk
+                self.processor.publish(result)
+            if progress:
+                processed = int(round(result["time_position"] * self.sample_rate)) + chunk_samples
+                progress(processed if total_samples is None else min(processed, total_samples), total_samples)
+            yield result
+        if cancel_event is not None and cancel_event.is_set():
+            raise AnalysisCancelled(path)
+
+    def analyze(self, path, progress=None, cancel_event=None):
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key(path, self.cache_params())
+            summary = self.cache.get(cache_key)
+            if summary is not None:
+                summary["file"] = path
+                summary["timeline"] = ResultTimeline.from_columns(summary["timeline"])
+                # Replay the stored chunks so subscribers (e.g. an EventStore session) see
+                # the same events as for an analyzed file
+                for result in summary["timeline"].to_results():
+                    result["source"] = "file"
+                    self.processor.publish(result)
+                return summary
+
+        # Only the chunks that had notes are kept, as rows of the timeline
+        timeline = ResultTimeline()
+        gated_chunks = 0
+        for result in self.iter_results(path, progress, cancel_event):
+            if result["notes"]:
+                timeline.append(result)
+            gated_chunks += result.get("gated", False)
+        if self.processor.FILE_CHORD_SMOOTHING:
+            smooth_timeline_chords(timeline, ChordTracker(self.processor.CHORD_SWITCH_PENALTY))
+        summary = timeline.summary()
+        if self.processor.SPECTRAL_GATING:
+            summary["gated_chunks"] = gated_chunks  # Chunks that reused the previous chunk's result
+        summary["file"] = path
+        if cache_key is not None:
+            self.cache.put(cache_key, dict(summary, timeline=timeline.columns()))
+        summary["timeline"] = timeline
+        return summary
+
+def find_audio_files(paths, recursive=True):
+    """Expand files and directories into a sorted list of audio files."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, subfolders, files in os.walk(path):
+                if not recursive:
+                    subfolders.clear()
+                subfolders.sort()
+                found.extend(os.path.join(folder, name) for name in sorted(files)
+                             if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            found.append(path)
+    return found
@@ -1,91 +1,164 @@
 # file_operations.py
 
 import os
+import queue
+import threading
+import time
 import traceback
-from collections import Counter
 from tkinter import filedialog, messagebox
-import librosa
+from audio_processing import shard_executor
+from file_analysis import AnalysisCancelled, FileAnalyzer
+from result_cache import ResultCache
 
 class FileOperations:
     def __init__(self, app):
         self.SAMPLE_RATE = 44100
+        self.ANALYSIS_WORKERS = os.cpu_count() or 1
         self.selected_file = None
+        self.POLL_INTERVAL_MS = 100
+        self.result_cache = None
+        self.executor = None  # Shard process pool, started with the first analysis and kept until close()
+        self._analysis_thread = None
+        self._cancel_event = None
+        self._analysis_started = 0
         self.app = app
 
     def analyze_file(self):
-        """Analyze an audio file for notes and chords"""
+        """Analyze an audio file for notes and chords in a background worker"""
         if not self.selected_file:
             messagebox.showinfo("Info", "Please select an audio file first.")
             return
+        if self.is_analyzing():
+            return
         
-        self.app.gui_components.file_result_label.config(text="Analyzing...")
-        self.app.root.update()
+        gui = self.app.gui_components
+        gui.file_result_label.config(text="Analyzing...")
+        gui.progress_bar.config(mode="determinate", value=0)
+        gui.progress_label.config(text="")
+        gui.cancel_btn.config(state="normal")
         
-        try:
-            # Load the audio file
-            y, sr = librosa.load(self.selected_file, sr=self.SAMPLE_RATE)
-            
-            # Initialize results storage
-            chunk_results = []
-            
-            # Break into small chunks and analyze each
-            chunk_length = 1  # seconds
-            chunk_samples = chunk_length * sr
-            overlap = 0.5  # 50% overlap for smoother analysis
-            overlap_samples = int(overlap * chunk_samples)
-            
-            # Process chunks with overlap
-            for i in range(0, len(y) - chunk_samples, overlap_samples):
-                chunk = y[i:i + chunk_samples]
-                if len(chunk) < sr * 0.5:  # Skip very short chunks
-                    continue
-                
-                time_position = i / sr
-                result = self.app.audio_processing.process_audio(chunk, sample_rate=sr, is_live=False, time_position=time_position)
-                
-                if result["notes"]:  # Only keep chunks with detected notes
-                    chunk_results.append(result)
-            
-            if chunk_results:
-                # Analyze all detected notes and chords
-                all_detected_notes = set()
-                chord_counts = Counter()
-                
-                # Process all chunk results
-                for result in chunk_results:
-                    all_detected_notes.update(result["notes"])
-                    if result["chord"] != "No chord detected" and result["chord"] != "Error":
-                        chord_counts[result["chord"]] += 1
-                
-                # Get the most common chords (more than 5% of occurrences)
-                total_chunks = len(chunk_results)
-                significant_chords = [chord for chord, count in chord_counts.items() 
-                                    if count / total_chunks > 0.05]
-                
-                # If too many chords, take the most frequent ones
-                if len(significant_chords) > 8:
-                    significant_chords = [chord for chord, _ in chord_counts.most_common(8)]
-                
-                # Update UI with detected chord information
-                result_text = f"Detected Notes: {', '.join(sorted(all_detected_notes))}\n" 
-                result_text += f"Detected Chords: {', '.join(significant_chords)}"
-                
-                self.app.gui_components.file_result_label.config(text=result_text)
-    
-                # Add to log
-                filename = os.path.basename(self.selected_file)
-                self.app.log_manager.add_to_log(f"File Analysis: {filename} - Notes: {', '.join(sorted(all_detected_notes))} - Chords: {', '.join(significant_chords)}")
-            else:
-                self.app.gui_components.file_result_label.config(text="Could not detect any chords in this audio file.")
+        if self.result_cache is None:
+            self.result_cache = ResultCache()
+        if self.executor is None and self.ANALYSIS_WORKERS > 1:
+            self.executor = shard_executor(self.ANALYSIS_WORKERS)
+        # Break into 1 s chunks with 50% overlap; results arrive as blocks are decoded
+        analyzer = FileAnalyzer(self.app.audio_processing, sample_rate=self.SAMPLE_RATE,
+                                chunk_length=1, overlap=0.5, workers=self.ANALYSIS_WORKERS,
+                                cache=self.result_cache, executor=self.executor)
         
+        if self.app.event_store is not None:
+            self.app.event_store.start_session("file", self.selected_file)
+        # A queue per analysis, so nothing a previous run posted late can end up in this one
+        messages = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._analysis_started = time.monotonic()
+        self._analysis_thread = threading.Thread(
+            target=self._run_analysis, args=(analyzer, self.selected_file, self._cancel_event, messages), daemon=True
+        )
+        self._analysis_thread.start()
+        self.app.root.after(self.POLL_INTERVAL_MS, self._poll_analysis, self._analysis_thread, messages)
+
+    def is_analyzing(self):
+        return self._analysis_thread is not None and self._analysis_thread.is_alive()
+
+    def cancel_analysis(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    def close(self):
+        self.cancel_analysis()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _run_analysis(self, analyzer, path, cancel_event, messages):
+        # Worker thread: never touches widgets, only posts messages for _poll_analysis
+        def progress(processed, total):
+            messages.put(("progress", processed, total))
+        try:
+            summary = analyzer.analyze(path, progress=progress, cancel_event=cancel_event)
+            messages.put(("done", path, summary))
+        except AnalysisCancelled:
+            messages.put(("cancelled",))
         except Exception as e:
-            messagebox.showerror("Error", f"Analysis error: {str(e)}")
-            self.app.gui_components.file_result_label.config(text="Analysis failed")
             print(f"Detailed error: {traceback.format_exc()}")
+            messages.put(("error", str(e)))
+        finally:
+            if self.app.event_store is not None:
+                self.app.event_store.end_session("file")
+
+    def _poll_analysis(self, thread, messages):
+        # Runs on the Tk thread via root.after; drains everything the worker posted since last time.
+        # The thread is checked before draining: once it has ended, all its messages are queued.
+        gui = self.app.gui_components
+        finished = not thread.is_alive()
+        status = None
+        latest_progress = None
+        while True:
+            try:
+                message = messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "progress":
+                latest_progress = message
+                continue
+            status = message[0]
+            if not gui.file_result_label.winfo_exists():
+                continue
+            if message[0] == "done":
+                self._show_summary(message[1], message[2])
+            elif message[0] == "cancelled":
+                gui.file_result_label.config(text="Analysis cancelled")
+            else:
+                messagebox.showerror("Error", f"Analysis error: {message[1]}")
+                gui.file_result_label.config(text="Analysis failed")
+
+        if latest_progress and gui.progress_bar.winfo_exists():
+            self._show_progress(latest_progress[1], latest_progress[2])
+        if status is not None or finished:
+            if gui.cancel_btn.winfo_exists():
+                gui.cancel_btn.config(state="disabled")
+            if status == "done" and gui.progress_bar.winfo_exists():
+                gui.progress_bar.config(mode="determinate", value=100)
+                gui.progress_label.config(text="")
+            return
+        self.app.root.after(self.POLL_INTERVAL_MS, self._poll_analysis, thread, messages)
+
+    def _show_progress(self, processed, total):
+        gui = self.app.gui_components
+        elapsed = time.monotonic() - self._analysis_started
+        if not total:
+            gui.progress_bar.config(mode="indeterminate")
+            gui.progress_bar.step(5)
+            gui.progress_label.config(text=f"{processed / self.SAMPLE_RATE:.0f}s analyzed")
+            return
+        fraction = processed / total
+        gui.progress_bar.config(value=fraction * 100)
+        remaining = elapsed * (1 - fraction) / fraction if fraction > 0 else 0
+        gui.progress_label.config(text=f"{fraction * 100:.0f}% - about {remaining:.0f}s left")
+
+    def _show_summary(self, path, summary):
+        gui = self.app.gui_components
+        if summary["chunks_with_notes"]:
+            notes_text = ', '.join(summary["notes"])
+            chords_text = ', '.join(summary["chords"])
+            
+            # Update UI with detected chord information
+            result_text = f"Detected Notes: {notes_text}\n" 
+            result_text += f"Detected Chords: {chords_text}"
+            
+            gui.file_result_label.config(text=result_text)
+
+            # Add to log
+            filename = os.path.basename(path)
+            self.app.log_manager.add_to_log(f"File Analysis: {filename} - Notes: {notes_text} - Chords: {chords_text}",
+                                            source="file", notes=summary["notes"])
+        else:
+            gui.file_result_label.config(text="Could not detect any chords in this audio file.")
 
     def browse_file(self):
         filetypes = (
-            ('Audio files', '*.mp3 *.wav *.flac *.ogg'),
+            ('Audio files', '*.mp3 *.wav *.flac *.ogg *.aif *.aiff'),
             ('All files', '*.*')
         )
         
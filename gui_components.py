@@ -1,5 +1,7 @@
+import json
 import tkinter as tk
-from tkinter import ttk, scrolledtext
+from tkinter import ttk, scrolledtext, filedialog, messagebox
+from log_view import VirtualLogView
 
 class GuiManager:
     def __init__(self, app, accent_color, highlight_color, bg_color, text_color):
@@ -12,6 +14,16 @@ class GuiManager:
 
         self.is_listening = False
         self.log_entries = []
+        self.DISPLAY_RATE = 30  # Hz; how often the Tk thread picks up new results
+        self.latest_live_text = None  # Slot written by the analysis thread, read by refresh_display
+        # Live analysis window / hop presets, in samples
+        self.window_presets = {
+            "2048 / 256": (2048, 256),
+            "4096 / 512": (4096, 512),
+            "8192 / 512": (8192, 512),
+            "8192 / 1024": (8192, 1024),
+            "1024 / 1024": (1024, 1024),
+        }
 
     #GUI 
     def create_main_window(self):
@@ -212,6 +224,95 @@ class GuiManager:
         )
         self.result_label.pack(pady=10)
         
+        # Analysis window / hop selector and the latency actually achieved
+        window_frame = ttk.Frame(main_frame, style='TFrame')
+        window_frame.pack(pady=(0, 5))
+        
+        window_label = tk.Label(
+            window_frame,
+            text="Fereastră / pas:",
+            font=("Arial", 10),
+            bg=self.bg_color,
+            fg=self.text_color
+        )
+        window_label.pack(side=tk.LEFT, padx=5)
+        
+        live_audio = self.app.live_audio
+        self.window_choice = ttk.Combobox(
+            window_frame,
+            values=list(self.window_presets),
+            state="readonly",
+            width=12
+        )
+        self.window_choice.set(f"{live_audio.ANALYSIS_WINDOW} / {live_audio.HOP_SIZE}")
+        self.window_choice.bind("<<ComboboxSelected>>", self.on_window_selected)
+        self.window_choice.pack(side=tk.LEFT, padx=5)
+        
+        self.latency_label = tk.Label(
+            window_frame,
+            text="",
+            font=("Arial", 10),
+            bg=self.bg_color,
+            fg=self.text_color
+        )
+        self.latency_label.pack(side=tk.LEFT, padx=5)
+        self.refresh_latency()
+        
+        # Hot-path timings: off by default, switched on here at runtime
+        self.profiling_var = tk.BooleanVar(value=self.app.audio_processing.profiler.enabled)
+        profiling_check = tk.Checkbutton(
+            window_frame,
+            text="Măsoară timpii",
+            variable=self.profiling_var,
+            command=self.toggle_profiling,
+            font=("Arial", 10),
+            bg=self.bg_color,
+            fg=self.text_color,
+            activebackground=self.bg_color
+        )
+        profiling_check.pack(side=tk.LEFT, padx=5)
+        
+        # Constant-Q bins separate bass notes that the linear FFT merges
+        self.cqt_var = tk.BooleanVar(value=self.app.audio_processing.SPECTRUM == "cqt")
+        cqt_check = tk.Checkbutton(
+            window_frame,
+            text="Spectru constant-Q",
+            variable=self.cqt_var,
+            command=self.toggle_spectrum,
+            font=("Arial", 10),
+            bg=self.bg_color,
+            fg=self.text_color,
+            activebackground=self.bg_color
+        )
+        cqt_check.pack(side=tk.LEFT, padx=5)
+        
+        # Skip the full analysis while the spectrum is stable; the Statistici window shows how often
+        self.gating_var = tk.BooleanVar(value=self.app.audio_processing.SPECTRAL_GATING)
+        gating_check = tk.Checkbutton(
+            window_frame,
+            text="Sari cadrele stabile",
+            variable=self.gating_var,
+            command=self.toggle_gating,
+            font=("Arial", 10),
+            bg=self.bg_color,
+            fg=self.text_color,
+            activebackground=self.bg_color
+        )
+        gating_check.pack(side=tk.LEFT, padx=5)
+        
+        stats_btn = tk.Button(
+            window_frame,
+            text="Statistici",
+            font=("Arial", 10),
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.highlight_color,
+            activeforeground="white",
+            cursor="hand2",
+            command=self.open_stats_window
+        )
+        stats_btn.pack(side=tk.LEFT, padx=5)
+        
         # Create log area (mini version) with styled frame
         log_frame = ttk.Frame(main_frame, style='TFrame')
         log_frame.pack(pady=5, fill=tk.BOTH, expand=True)
@@ -374,6 +475,18 @@ class GuiManager:
         )
         self.file_result_label.pack(pady=10)
         
+        # Progress of the background analysis, with an estimate of the time left
+        self.progress_bar = ttk.Progressbar(main_frame, orient='horizontal', length=450, mode='determinate', maximum=100)
+        self.progress_bar.pack(pady=(0, 2))
+        self.progress_label = tk.Label(
+            main_frame,
+            text="",
+            font=("Arial", 10),
+            bg=self.bg_color,
+            fg=self.text_color
+        )
+        self.progress_label.pack()
+        
         # Create log area (mini version)
         log_frame = ttk.Frame(main_frame, style='TFrame')
         log_frame.pack(pady=5, fill=tk.BOTH, expand=True)
@@ -421,6 +534,24 @@ class GuiManager:
         )
         analyze_btn.pack(side=tk.LEFT, padx=10)
         
+        # Create cancel button, enabled only while an analysis runs
+        self.cancel_btn = tk.Button(
+            btn_frame, 
+            text="Anulează", 
+            font=("Arial", 14, "bold"),
+            width=12,
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.highlight_color,
+            activeforeground="white",
+            relief=tk.RAISED,
+            bd=2,
+            cursor="hand2",
+            state=tk.DISABLED,
+            command=self.app.file_operations.cancel_analysis
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=10)
+        
         # Create return button with styling
         return_btn = tk.Button(
             btn_frame, 
@@ -482,20 +613,15 @@ class GuiManager:
         log_frame = ttk.Frame(main_frame, style='TFrame')
         log_frame.pack(pady=10, fill=tk.BOTH, expand=True)
         
-        log_text = scrolledtext.ScrolledText(
+        # Only the visible rows are ever inserted, so this opens instantly however long the session
+        log_view = VirtualLogView(
             log_frame,
-            width=75,
-            height=20,
+            self.app.log_manager.store,
             font=("Consolas", 9),
-            wrap=tk.WORD,
             bg="white",
             fg=self.text_color
         )
-        log_text.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
-        
-        # Fill with log entries
-        for entry in self.app.log_manager.log_entries:
-            log_text.insert(tk.END, entry + "\n")
+        log_view.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
         
         # Create button frame with styling
         btn_frame = ttk.Frame(main_frame, style='TFrame')
@@ -514,7 +640,7 @@ class GuiManager:
             relief=tk.RAISED,
             bd=2,
             cursor="hand2",
-            command=lambda: self.app.log_manager.save_log_to_file(log_text.get("1.0", tk.END))
+            command=self.app.log_manager.save_log_to_file
         )
         save_btn.pack(side=tk.LEFT, padx=10)
         
@@ -531,7 +657,7 @@ class GuiManager:
             relief=tk.RAISED,
             bd=2,
             cursor="hand2",
-            command=lambda: self.app.log_manager.clear_log(log_text)
+            command=lambda: self.app.log_manager.clear_log(log_view)
         )
         clear_btn.pack(side=tk.LEFT, padx=10)
         
@@ -569,7 +695,162 @@ class GuiManager:
         )
         copyright_label.pack(fill=tk.X, pady=5)
     #GUI
+    def show_analysis_result(self, result):
+        # Subscribed to AudioProcessor; runs on an analysis thread, so it never touches widgets.
+        # Live text goes into a single slot that refresh_display picks up, log lines are queued.
+        if result.get("source") == "file":
+            if result["chord"] in ("No notes", "Error"):
+                return
+            time_position = round(result["time_position"], 2)
+            if result["notes"]:
+                message = f"File Analysis at {time_position}s - Notes: {', '.join(result['notes'])} - Chord: {result['chord']}"
+            else:
+                message = f"File Analysis at {time_position}s - No notes detected"
+            self.app.log_manager.add_to_log(message, source="file", notes=result["notes"],
+                                            chord=result["chord"], confidence=result["confidence"])
+            return
+
+        if "error" in result:
+            result_text = f"Error: {result['error']}"
+            log_text = None
+        elif result["notes"]:
+            result_text = f"Notes: {', '.join(result['notes'])}\nChord: {result['chord']}"
+            log_text = f"Live Detection - Notes: {', '.join(result['notes'])} - Chord: {result['chord']}"
+        else:
+            result_text = "No notes"
+            log_text = "Live Detection - No notes detected"
+
+        self.latest_live_text = result_text  # Overwrites anything not yet displayed
+        if log_text:
+            self.app.log_manager.add_to_log(log_text, source="live", notes=result["notes"],
+                                            chord=result["chord"], confidence=result["confidence"])
+    #GUI
+    def start_display_refresh(self):
+        self.app.root.after(int(1000 / self.DISPLAY_RATE), self.refresh_display)
+    #GUI
+    def refresh_display(self):
+        # Runs on the Tk thread DISPLAY_RATE times a second, whatever the analysis rate is
+        try:
+            text = self.latest_live_text
+            if text is not None and self.app.live_audio.is_listening() and self.widget_exists("result_label"):
+                if self.result_label.cget("text") != text:
+                    self.result_label.config(text=text)
+
+            lines = self.app.log_manager.take_pending()
+            if lines and self.widget_exists("mini_log"):
+                # One insert for everything queued since the last refresh, highlighted lines keep their tag
+                chunks = []
+                for line, highlight in lines:
+                    chunks.extend((line + "\n", ("highlight",) if highlight else ()))
+                self.mini_log.config(state="normal")
+                self.mini_log.insert(tk.END, *chunks)
+                self.mini_log.see(tk.END)
+                self.mini_log.config(state="disabled")
+        finally:
+            self.start_display_refresh()
+    #GUI
+    def widget_exists(self, name):
+        widget = getattr(self, name, None)
+        return widget is not None and widget.winfo_exists()
+    #GUI
+    def on_window_selected(self, event=None):
+        window, hop = self.window_presets[self.window_choice.get()]
+        self.app.live_audio.set_analysis_window(window, hop)
+    #GUI
+    def toggle_profiling(self):
+        self.app.audio_processing.profiler.enabled = self.profiling_var.get()
+    #GUI
+    def toggle_gating(self):
+        self.app.audio_processing.SPECTRAL_GATING = self.gating_var.get()
+    #GUI
+    def toggle_spectrum(self):
+        # Read by process_audio on the next frame, for live and file analysis alike
+        self.app.audio_processing.SPECTRUM = "cqt" if self.cqt_var.get() else "fft"
+    #GUI
+    def stats_snapshot(self):
+        snapshot = self.app.audio_processing.profiler.snapshot()
+        snapshot["live"] = self.app.live_audio.get_stats()
+        return snapshot
+    #GUI
+    def open_stats_window(self):
+        # Separate window so the stats stay visible next to the live results
+        if getattr(self, "stats_window", None) is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        self.stats_window = tk.Toplevel(self.app.root, bg=self.bg_color)
+        self.stats_window.title("Statistici")
+        
+        self.stats_text = scrolledtext.ScrolledText(
+            self.stats_window,
+            width=72,
+            height=24,
+            font=("Consolas", 9),
+            bg="white",
+            fg=self.text_color
+        )
+        self.stats_text.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        
+        btn_frame = ttk.Frame(self.stats_window, style='TFrame')
+        btn_frame.pack(pady=(0, 10))
+        for text, command in (("Salvează JSON", self.save_stats), ("Resetează", self.reset_stats)):
+            tk.Button(
+                btn_frame,
+                text=text,
+                font=("Arial", 10, "bold"),
+                width=14,
+                bg=self.accent_color,
+                fg="white",
+                activebackground=self.highlight_color,
+                activeforeground="white",
+                cursor="hand2",
+                command=command
+            ).pack(side=tk.LEFT, padx=5)
+        self.refresh_stats()
+    #GUI
+    def refresh_stats(self):
+        if not self.stats_window.winfo_exists():
+            return
+        profiler = self.app.audio_processing.profiler
+        live = self.app.live_audio.get_stats()
+        text = profiler.format_table() if profiler.enabled or profiler.stages else "Măsurarea este oprită."
+        text += "\n\n" + "\n".join(f"{name:<22}{value:>10.2f}" for name, value in live.items())
+        self.stats_text.delete("1.0", tk.END)
+        self.stats_text.insert(tk.END, text)
+        self.app.root.after(1000, self.refresh_stats)
+    #GUI
+    def save_stats(self):
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            title="Salvează statisticile"
+        )
+        if not filename:
+            return
+        try:
+            with open(filename, "w") as f:
+                json.dump(self.stats_snapshot(), f, indent=2)
+        except Exception as e:
+            messagebox.showerror("Error", f"Nu s-au putut salva statisticile: {str(e)}")
+    #GUI
+    def reset_stats(self):
+        self.app.audio_processing.profiler.reset()
+        self.app.live_audio.max_lag = 0.0
+    #GUI
+    def refresh_latency(self):
+        # Polls LiveAudio twice a second for as long as the live window is open
+        if not self.latency_label.winfo_exists():
+            return
+        live_audio = self.app.live_audio
+        if live_audio.is_listening():
+            stats = live_audio.get_stats()
+            text = f"Latență: {stats['latency_ms']:.0f} ms (max {stats['max_latency_ms']:.0f} ms)"
+        else:
+            text = f"Actualizare la {live_audio.HOP_SIZE / live_audio.SAMPLE_RATE * 1000:.0f} ms"
+        self.latency_label.config(text=text)
+        self.app.root.after(500, self.refresh_latency)
+    #GUI
     def return_to_main_window(self):
+        self.app.file_operations.cancel_analysis()
         if self.app.live_audio.is_listening():
             self.app.live_audio.stop_listening()
             self.listen_btn.config(text="Start")
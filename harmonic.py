@@ -0,0 +1,163 @@
+"""Vectorized harmonic grouping of spectral peaks, for one frame or a batch of frames.
+
+Peaks are handed in per frame, loudest first, exactly as notes_from_peaks always took
+them. A peak is a harmonic when its frequency is within HARMONIC_TOLERANCE of an integer
+multiple (above MIN_HARMONIC_RATIO) of a louder peak that is itself a fundamental.
+Because "is a fundamental" depends on the louder peaks' own status, the relation is
+solved as a fixed point over the harmonic graph instead of a nested loop, which gives
+the same answer as the original loop.
+
+Small peak sets use the full peak-ratio matrix. Larger ones (dense polyphony, whole
+batches of frames) find parent candidates with binary searches in log-frequency, one
+per peak and harmonic number, so the work grows with peaks x harmonics rather than
+peaks squared.
+"""
+
+import numpy as np
+
+HARMONIC_TOLERANCE = 0.02
+MIN_HARMONIC_RATIO = 1.2
+MIN_RELATIVE_AMP = 0.15    # Quieter peaks, relative to the frame's loudest, are ignored
+FUNDAMENTAL_MATCH_HZ = 5   # A fundamental's amplitude is that of the loudest peak this close
+HARMONIC_BONUS = 0.3
+# Frames are laid out this far apart in the search keys so a search never crosses frames
+FRAME_SPACING_OCTAVES = 64.0
+FRAME_SPACING_HZ = 1e6
+SEARCH_SLACK = 1e-9
+# Up to this many peaks the full peak-ratio matrix is cheaper than the binary searches
+RATIO_MATRIX_LIMIT = 48
+
+def expand_ranges(lo, hi):
+    """All (range number, index) pairs of the half-open ranges [lo, hi)."""
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    rows = np.repeat(np.arange(len(lo)), counts)
+    offsets = np.cumsum(counts) - counts
+    index = np.arange(total) - np.repeat(offsets, counts) + np.repeat(lo, counts)
+    return rows, index
+
+def harmonic_edges(freqs, frame_ids):
+    """(child, parent) pairs where freqs[child] is a harmonic of the louder freqs[parent].
+
+    Indices are positions in the input, which lists each frame's peaks loudest first.
+    """
+    n = len(freqs)
+    if n < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    if n <= RATIO_MATRIX_LIMIT:
+        ratio = freqs[:, np.newaxis] / freqs[np.newaxis, :]
+        related = ((np.abs(ratio - np.round(ratio)) < HARMONIC_TOLERANCE) & (ratio > MIN_HARMONIC_RATIO)
+                   & (frame_ids[:, np.newaxis] == frame_ids[np.newaxis, :]))
+        return np.nonzero(np.tril(related, -1))  # Parent louder, i.e. earlier, than child
+    key = np.log2(freqs) + frame_ids * FRAME_SPACING_OCTAVES
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    max_harmonic = int(freqs.max() / freqs.min() + HARMONIC_TOLERANCE)
+    if max_harmonic < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    harmonics = np.arange(2, max_harmonic + 1)
+    # A parent at harmonic h lies strictly inside (f / (h + tol), f / (h - tol)); the slack
+    # widens the search slightly and the exact test below has the final word
+    lo = np.searchsorted(sorted_key, (key[:, np.newaxis] - np.log2(harmonics + HARMONIC_TOLERANCE)).ravel() - SEARCH_SLACK, "left")
+    hi = np.searchsorted(sorted_key, (key[:, np.newaxis] - np.log2(harmonics - HARMONIC_TOLERANCE)).ravel() + SEARCH_SLACK, "right")
+    rows, index = expand_ranges(lo, hi)
+    child = rows // len(harmonics)
+    parent = order[index]
+
+    ratio = freqs[child] / freqs[parent]
+    keep = ((parent < child) & (frame_ids[parent] == frame_ids[child])
+            & (np.abs(ratio - np.round(ratio)) < HARMONIC_TOLERANCE) & (ratio > MIN_HARMONIC_RATIO))
+    return child[keep], parent[keep]
+
+def solve_fundamentals(n, child, parent):
+    """A peak is a fundamental unless one of its parents is; iterated to the fixed point.
+
+    Every edge points from a quieter peak to a louder one, so the graph is acyclic and the
+    fixed point is unique; each pass settles at least one more level of it.
+    """
+    is_fundamental = np.ones(n, dtype=bool)
+    for _ in range(n + 1):
+        blocked = np.zeros(n, dtype=bool)
+        blocked[child[is_fundamental[parent]]] = True
+        if np.array_equal(~blocked, is_fundamental):
+            break
+        is_fundamental = ~blocked
+    return is_fundamental
+
+def matched_amplitudes(freqs, norm_amps, frame_ids, targets):
+    """For each target peak, the amplitude of the loudest peak of its frame within FUNDAMENTAL_MATCH_HZ."""
+    key = freqs + frame_ids * FRAME_SPACING_HZ
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    if len(freqs) < 2 or np.diff(sorted_key).min() > FUNDAMENTAL_MATCH_HZ + SEARCH_SLACK:
+        return norm_amps[targets]  # No two peaks that close: every target matches only itself
+    lo = np.searchsorted(sorted_key, key[targets] - FUNDAMENTAL_MATCH_HZ - SEARCH_SLACK, "left")
+    hi = np.searchsorted(sorted_key, key[targets] + FUNDAMENTAL_MATCH_HZ + SEARCH_SLACK, "right")
+    rows, index = expand_ranges(lo, hi)
+    match = order[index]
+    keep = (frame_ids[match] == frame_ids[targets[rows]]) & (np.abs(freqs[match] - freqs[targets[rows]]) < FUNDAMENTAL_MATCH_HZ)
+    first = np.full(len(targets), len(freqs))
+    np.minimum.at(first, rows[keep], match[keep])  # Lowest position = loudest
+    return norm_amps[first]
+
+def rank_fundamentals(freqs, amps, frame_ids=None, salience=None):
+    """Fundamentals of every frame, each frame's most prominent first.
+
+    freqs and amps hold the peaks of all frames back to back, every frame loudest first;
+    frame_ids says which frame each peak belongs to (all zeros for a single frame).
+    Prominence is the fundamental's relative amplitude plus HARMONIC_BONUS when at least
+    one harmonic was attributed to it. With `salience` (one value per peak, e.g. from
+    harmonic_sum_spectrum) prominence is the salience relative to the frame's maximum.
+
+    Returns (frame ids, frequencies, prominences) of the fundamentals, grouped by frame.
+    """
+    freqs = np.asarray(freqs, dtype=np.float64)
+    amps = np.asarray(amps, dtype=np.float64)
+    frame_ids = np.zeros(len(freqs), dtype=np.intp) if frame_ids is None else np.asarray(frame_ids)
+    if len(freqs) == 0:
+        return frame_ids[:0], freqs[:0], freqs[:0]
+
+    if frame_ids[0] == frame_ids[-1]:  # One frame
+        frame_starts = np.zeros(1, dtype=np.intp)
+        norm_amps = amps / amps[0]
+    else:
+        frame_starts = np.flatnonzero(np.concatenate(([True], frame_ids[1:] != frame_ids[:-1])))
+        norm_amps = amps / np.repeat(amps[frame_starts], np.diff(np.append(frame_starts, len(amps))))
+
+    candidates = np.flatnonzero(norm_amps >= MIN_RELATIVE_AMP)
+    cand_freqs = freqs[candidates]
+    cand_frames = frame_ids[candidates]
+    child, parent = harmonic_edges(cand_freqs, cand_frames)
+    is_fundamental = solve_fundamentals(len(candidates), child, parent)
+
+    fundamentals = np.flatnonzero(is_fundamental)
+    if salience is None:
+        # A harmonic counts towards the first (loudest) fundamental it fits
+        attached = is_fundamental[parent] & ~is_fundamental[child]
+        first_parent = np.full(len(candidates), len(candidates))
+        np.minimum.at(first_parent, child[attached], parent[attached])
+        has_harmonics = np.zeros(len(candidates) + 1, dtype=bool)
+        has_harmonics[first_parent] = True
+        fund_amps = matched_amplitudes(freqs, norm_amps, frame_ids, candidates[fundamentals])
+        prominence = fund_amps + HARMONIC_BONUS * has_harmonics[fundamentals]
+    else:
+        salience = np.asarray(salience, dtype=np.float64)
+        frame_peak_salience = np.maximum.reduceat(salience, frame_starts)
+        frame_index = np.searchsorted(frame_starts, candidates[fundamentals], "right") - 1
+        prominence = salience[candidates[fundamentals]] / frame_peak_salience[frame_index]
+
+    fund_frames = cand_frames[fundamentals]
+    ranked = np.lexsort((np.arange(len(fundamentals)), -prominence, fund_frames))
+    return fund_frames[ranked], cand_freqs[fundamentals][ranked], prominence[ranked]
+
+def harmonic_sum_spectrum(magnitude, harmonics=5, decay=0.8):
+    """Salience of every bin as a fundamental: sum over h of decay**(h-1) * magnitude[h * bin].
+
+    Works on one spectrum or on a (frames, bins) batch along the last axis.
+    """
+    magnitude = np.asarray(magnitude, dtype=np.float64)
+    salience = magnitude.copy()
+    for h in range(2, harmonics + 1):
+        decimated = magnitude[..., ::h]
+        salience[..., :decimated.shape[-1]] += decay ** (h - 1) * decimated
+    return salience
@@ -0,0 +1,123 @@
+from bisect import bisect_right
+import time
+import numpy as np
+
+# Shared bucket edges: 10 per decade from 1 us to 10 s, so every histogram is the same
+# fixed-size array and recording never allocates
+BUCKET_EDGES = tuple(10 ** (np.arange(-60, 11) / 10))
+
+class LatencyHistogram:
+    """Fixed log-bucket histogram of durations in seconds."""
+
+    def __init__(self):
+        self.counts = np.zeros(len(BUCKET_EDGES) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_right(BUCKET_EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile, never above the observed max."""
+        if self.count == 0:
+            return 0.0
+        rank = np.searchsorted(np.cumsum(self.counts), q / 100 * self.count)
+        if rank >= len(BUCKET_EDGES):
+            return self.max
+        return min(BUCKET_EDGES[rank], self.max)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+class Profiler:
+    """Per-stage timings for the analysis hot path, switchable at runtime.
+
+    Callers thread a timestamp through their stages:
+
+        t = profiler.start()
+        ...
+        t = profiler.lap("fft", t)
+
+    When disabled both calls return 0.0 after one attribute check, so the
+    instrumentation can stay in the code permanently.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
+        self.started_at = time.time()
+        self.last_arrival = None
+
+    def histogram(self, name):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = LatencyHistogram()
+        return histogram
+
+    def start(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def lap(self, stage, since):
+        if not self.enabled:
+            return 0.0
+        now = time.perf_counter()
+        if since:  # 0.0 means profiling was switched on mid-call
+            self.histogram(stage).record(now - since)
+        return now
+
+    def record(self, stage, seconds):
+        if self.enabled:
+            self.histogram(stage).record(seconds)
+
+    def count(self, counter, n=1):
+        if self.enabled:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def record_arrival(self, timestamp, interval):
+        """Live path: jitter of a block arriving `interval` seconds after the previous one was due."""
+        if not self.enabled:
+            return
+        if self.last_arrival is not None:
+            self.histogram("arrival_jitter").record(abs(timestamp - self.last_arrival - interval))
+        self.last_arrival = timestamp
+
+    def record_deadline(self, elapsed, deadline):
+        """Live path: a miss is a block whose result took longer than the next block takes to arrive."""
+        if not self.enabled:
+            return
+        self.count("deadline_checks")
+        if elapsed > deadline:
+            self.count("deadline_misses")
+
+    def snapshot(self):
+        return {
+            "enabled": self.enabled,
+            "since": self.started_at,
+            "stages": {name: histogram.summary() for name, histogram in list(self.stages.items())},
+            "counters": dict(self.counters),
+        }
+
+    def format_table(self):
+        lines = [f"{'stage':<16}{'count':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+        for name, stats in sorted(self.snapshot()["stages"].items()):
+            lines.append(f"{name:<16}{stats['count']:>8}{stats['p50_ms']:>9.3f}{stats['p95_ms']:>9.3f}"
+                         f"{stats['p99_ms']:>9.3f}{stats['max_ms']:>9.3f}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<16}{value:>8}")
+        return "\n".join(lines)
@@ -3,18 +3,37 @@ import time
 import sounddevice as sd
 import numpy as np
 from tkinter import messagebox
+from ring_buffer import AudioRingBuffer, SlidingWindow
 
 class LiveAudio:
-    def __init__(self, app, sample_rate=44100, buffer_size=1024):
+    def __init__(self, app, sample_rate=44100, window=4096, hop=512):
         self.SAMPLE_RATE = sample_rate
-        self.BUFFER_SIZE = buffer_size
+        # Sliding-window mode: analyze the last ANALYSIS_WINDOW samples every HOP_SIZE samples.
+        # A window equal to the hop gives the old one-block-at-a-time behaviour.
+        self.ANALYSIS_WINDOW = window
+        self.HOP_SIZE = hop
+        self.RING_CAPACITY = 64  # hops, about 0.75 s at 512 samples
+        self.OVERFLOW_POLICY = "drop_oldest"
         self._stop_event = threading.Event()
+        self._stop_event.set()  # Not listening until toggled on
+        self._reconfigure = threading.Event()
         self.audio_thread = None
+        self.ring = None
+        self.window = None
+        self.filtered_window = None
+        self.input_overflows = 0
+        self.stream_latency = 0.0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
         self.app = app
 
     def toggle_listening(self):
         if not self.is_listening():
             self._stop_event.clear()
+            self.app.audio_processing.reset_filters()
+            self.app.gui_components.latest_live_text = None  # Drop the last session's result
+            if self.app.event_store is not None:
+                self.app.event_store.start_session("live")
             self.app.gui_components.listen_btn.config(text="Stop")
             self.app.gui_components.result_label.config(text="Listening...")
 
@@ -27,25 +46,90 @@ class LiveAudio:
     def is_listening(self):
         return not self._stop_event.is_set()
 
+    def set_analysis_window(self, window, hop):
+        """Change window length and hop; a running stream is reopened with the new hop."""
+        window, hop = int(window), int(hop)
+        if hop <= 0 or window < hop:
+            raise ValueError(f"Need 0 < hop <= window, got window={window}, hop={hop}")
+        self.ANALYSIS_WINDOW = window
+        self.HOP_SIZE = hop
+        if self.is_listening():
+            self._reconfigure.set()
+
     def stop_listening(self):
         self._stop_event.set()
+        if self.app.event_store is not None:
+            self.app.event_store.end_session("live")
         self.app.gui_components.listen_btn.config(text="Start")
         self.app.gui_components.result_label.config(text="Andra asteaptă.")
 
     def live_audio_callback(self, indata, frames, time_info, status):
+        # Real-time audio thread: copy the block into the ring and return, nothing else
         if status:
-            print(status)
-            return
+            self.input_overflows += 1
+        self.ring.write(indata[:, 0], time.perf_counter())  # mono
+
+    def analysis_loop(self):
+        # Consumer side of the ring, running on audio_thread while the stream is open.
+        # Each hop is band-passed once on arrival so overlapping windows never run
+        # through the stateful streaming filter twice.
+        processor = self.app.audio_processing
+        profiler = processor.profiler
+        hop_seconds = self.HOP_SIZE / self.SAMPLE_RATE
+        profiler.last_arrival = None
+        while not self._stop_event.is_set() and not self._reconfigure.is_set():
+            item = self.ring.read()
+            if item is None:
+                self.ring.wait(0.1)
+                continue
+            hop_buffer, captured_at = item
+            profiler.record_arrival(captured_at, hop_seconds)
+            t = profiler.start()
+            self.window.push(hop_buffer)
+            self.filtered_window.push(
+                processor.filter_audio(hop_buffer, lowcut=55, highcut=2500, fs=self.SAMPLE_RATE, stream=True)
+            )
+            profiler.lap("bandpass", t)
+            if not self.window.is_full():
+                continue
+            processor.process_audio(self.window.window(), is_live=True,
+                                    filtered_audio=self.filtered_window.window())
+            self.last_lag = time.perf_counter() - captured_at
+            self.max_lag = max(self.max_lag, self.last_lag)
+            profiler.record("live_lag", self.last_lag)
+            profiler.record_deadline(self.last_lag, hop_seconds)
 
-        audio_buffer = indata[:, 0]  # mono
-        self.app.audio_processing.process_audio(audio_buffer, is_live=True)
+    def get_stats(self):
+        ring = self.ring
+        return {
+            "overruns": ring.overruns if ring else 0,
+            "skipped_blocks": ring.skipped if ring else 0,
+            "queue_depth": ring.depth() if ring else 0,
+            "input_overflows": self.input_overflows,
+            "consumer_lag_ms": self.last_lag * 1000,
+            "max_consumer_lag_ms": self.max_lag * 1000,
+            "window_ms": self.ANALYSIS_WINDOW / self.SAMPLE_RATE * 1000,
+            "hop_ms": self.HOP_SIZE / self.SAMPLE_RATE * 1000,
+            # Device input latency plus the time from the hop's callback to its published result
+            "latency_ms": (self.stream_latency + self.last_lag) * 1000,
+            "max_latency_ms": (self.stream_latency + self.max_lag) * 1000,
+            # Frames whose full analysis spectral gating skipped, when it is on
+            **self.app.audio_processing.live_gate.stats(),
+        }
 
     def start_live_detection(self):
+        self.input_overflows = 0
+        self.last_lag = self.max_lag = 0.0
         try:
-            with sd.InputStream(callback=self.live_audio_callback, samplerate=self.SAMPLE_RATE, 
-                                channels=1, blocksize=self.BUFFER_SIZE):
-                while not self._stop_event.is_set():
-                    time.sleep(0.1)
+            while not self._stop_event.is_set():
+                self._reconfigure.clear()
+                self.ring = AudioRingBuffer(self.RING_CAPACITY, self.HOP_SIZE, self.OVERFLOW_POLICY)
+                self.window = SlidingWindow(self.ANALYSIS_WINDOW)
+                self.filtered_window = SlidingWindow(self.ANALYSIS_WINDOW)
+                with sd.InputStream(callback=self.live_audio_callback, samplerate=self.SAMPLE_RATE, 
+                                    channels=1, blocksize=self.HOP_SIZE) as stream:
+                    self.stream_latency = stream.latency
+                    self.analysis_loop()
         except Exception as e:
             messagebox.showerror("Error", f"Audio input error: {str(e)}")
             self._stop_event.set()
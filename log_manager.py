@@ -1,15 +1,31 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import datetime
+from collections import deque
+from log_store import LogStore, format_record, make_record
 
 class LogManager:
-    def __init__(self, app, mini_log=None):
-        self.log_entries = []
+    def __init__(self, app, mini_log=None, spill_path=None):
+        self.LOG_CAPACITY = 5000  # records kept in memory
+        # JSON Lines file for records pushed out of memory; None drops them.
+        # Pass spill_path, or set LOG_SPILL_PATH at any time to start spilling
+        self.store = LogStore(self.LOG_CAPACITY, spill_path)
         self.mini_log = mini_log
+        self.pending_lines = deque()  # (line, highlight) waiting for the next display refresh
         self.last_log_time = datetime.datetime.now() - datetime.timedelta(seconds=2)
 
     #Log
-    def save_log_to_file(self, log_content):
+    @property
+    def LOG_SPILL_PATH(self):
+        return self.store.spill_path
+
+    @LOG_SPILL_PATH.setter
+    def LOG_SPILL_PATH(self, path):
+        # Records spilled before the change stay in the previous file
+        self.store.spill_path = path
+
+    #Log
+    def save_log_to_file(self):
         try:
             filename = filedialog.asksaveasfilename(
                 defaultextension=".txt",
@@ -17,16 +33,19 @@ class LogManager:
                 title="A fost salvat cu succes"
             )
             if filename:
+                # From the store, not the viewer, which only holds the rows on screen
                 with open(filename, "w") as f:
-                    f.write(log_content)
+                    for record in self.store.iter_all():
+                        f.write(format_record(record) + "\n")
                 messagebox.showinfo("Success", "A fost salvat cu succes!")
         except Exception as e:
             messagebox.showerror("Error", f"Fraiere, mai incearca... {str(e)}")
     #Log
-    def clear_log(self, log_text_widget):
+    def clear_log(self, log_view):
         if messagebox.askyesno("Sterge memoria Andrei", "Sigur vrei sa stergi????"):
-            self.log_entries = []
-            log_text_widget.delete("1.0", tk.END)
+            self.store.clear()
+            self.pending_lines.clear()
+            log_view.redraw()
             # Clear mini logs if they exist
             try:
                 self.mini_log.config(state="normal")
@@ -35,7 +54,7 @@ class LogManager:
             except:
                 pass
     #Log
-    def add_to_log(self, message, highlight=False):
+    def add_to_log(self, message, highlight=False, source="message", notes=None, chord=None, confidence=None):
         # Check if 1 second has passed since last log entry
         current_time = datetime.datetime.now()
         
@@ -46,24 +65,18 @@ class LogManager:
         # Only add log entry if at least 1 second has passed
         time_diff = (current_time - self.last_log_time).total_seconds()
         if time_diff >= 1.0:
-            timestamp = current_time.strftime("%Y-%m-%d %H:%M:%S")
-            log_entry = f"[{timestamp}] {message}"
-            self.log_entries.append(log_entry)
+            record = make_record(message, source, notes, chord, confidence, highlight)
+            log_entry = format_record(record)
+            self.store.append(record)
             
             # Update the last log time
             self.last_log_time = current_time
     
-            # Update mini log if it exists
-            try:
-                self.mini_log.config(state="normal")
-    
-                # Add highlighting for important entries
-                if highlight:
-                    self.mini_log.insert(tk.END, log_entry + "\n", "highlight")
-                else:
-                    self.mini_log.insert(tk.END, log_entry + "\n")
-    
-                self.mini_log.see(tk.END)  # Scroll to the end
-                self.mini_log.config(state="disabled")
-            except:
-                pass
+            # Called from analysis threads too, so the mini log is filled later by the Tk thread
+            self.pending_lines.append((log_entry, highlight))
+    #Log
+    def take_pending(self):
+        lines = []
+        while self.pending_lines:
+            lines.append(self.pending_lines.popleft())
+        return lines
@@ -0,0 +1,84 @@
+import datetime
+import json
+import threading
+
+class LogStore:
+    """Bounded ring of structured log records, with optional overflow to a JSON Lines file.
+
+    A record is a dict with time (epoch seconds), source ("live", "file" or "message"),
+    message, notes, chord, confidence and highlight. Once `capacity` records are held the
+    oldest is dropped for every new one, or appended to `spill_path` when that is set.
+    Records are addressed by position (0 = oldest still in memory), so a viewer can ask
+    for any window of rows in time proportional to the window, not to the session.
+    """
+
+    def __init__(self, capacity=5000, spill_path=None):
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.records = [None] * capacity
+        self.start = 0     # Slot of the oldest record
+        self.count = 0
+        self.dropped = 0   # Evicted records, spilled to disk or not
+        self.version = 0   # Bumped on every change so views can tell when to redraw
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def append(self, record):
+        with self._lock:
+            if self.count == self.capacity:
+                evicted = self.records[self.start]
+                self.records[self.start] = record
+                self.start = (self.start + 1) % self.capacity
+                self.dropped += 1
+                if self.spill_path:
+                    self._spill(evicted)
+            else:
+                self.records[(self.start + self.count) % self.capacity] = record
+                self.count += 1
+            self.version += 1
+
+    def _spill(self, record):
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def slice(self, first, stop):
+        """Records first..stop-1, oldest first."""
+        with self._lock:
+            first, stop = max(first, 0), min(stop, self.count)
+            return [self.records[(self.start + i) % self.capacity] for i in range(first, stop)]
+
+    def clear(self):
+        with self._lock:
+            self.records = [None] * self.capacity
+            self.start = self.count = self.dropped = 0
+            self.version += 1
+            if self.spill_path:
+                open(self.spill_path, "w").close()
+
+    def iter_all(self):
+        """Spilled records, then the ones in memory, oldest first."""
+        if self.spill_path:
+            try:
+                with open(self.spill_path, encoding="utf-8") as f:
+                    for line in f:
+                        yield json.loads(line)
+            except FileNotFoundError:
+                pass
+        yield from self.slice(0, self.count)
+
+def make_record(message, source="message", notes=None, chord=None, confidence=None, highlight=False):
+    return {
+        "time": datetime.datetime.now().timestamp(),
+        "source": source,
+        "message": message,
+        "notes": list(notes) if notes else [],
+        "chord": chord,
+        "confidence": confidence,
+        "highlight": highlight,
+    }
+
+def format_record(record):
+    timestamp = datetime.datetime.fromtimestamp(record["time"]).strftime("%Y-%m-%d %H:%M:%S")
+    return f"[{timestamp}] {record['message']}"
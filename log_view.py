@@ -0,0 +1,91 @@
+import tkinter as tk
+from tkinter import font as tkfont
+from tkinter import ttk
+from log_store import format_record
+
+class VirtualLogView(tk.Frame):
+    """Read-only log viewer that only ever holds the rows currently on screen.
+
+    The scrollbar is driven from the store's length instead of the Text widget's
+    content, so opening the view and scrolling cost the same for ten records or ten
+    thousand. While scrolled to the bottom the view follows new records.
+    """
+
+    REFRESH_MS = 500
+
+    def __init__(self, master, store, font=("Consolas", 9), bg="white", fg="black", **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.store = store
+        self.first = 0
+        self.rows = 20
+        self.follow = True
+        self.drawn_version = None
+        self.line_height = tkfont.Font(font=font).metrics("linespace")
+
+        self.text = tk.Text(self, font=font, wrap=tk.NONE, bg=bg, fg=fg, height=self.rows,
+                            state="disabled", cursor="arrow")
+        self.text.tag_configure("highlight", background="#ffff99")
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.text.bind("<Configure>", self.on_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.text.bind(sequence, self.on_wheel)
+        self.after(self.REFRESH_MS, self.poll)
+
+    def on_resize(self, event):
+        self.rows = max(1, event.height // self.line_height)
+        self.redraw()
+
+    def on_wheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self.first - 3)
+        else:
+            self.scroll_to(self.first + 3)
+        return "break"
+
+    def yview(self, action, amount, unit=None):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units" | "pages")
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.store)))
+        elif unit == "pages":
+            self.scroll_to(self.first + int(amount) * self.rows)
+        else:
+            self.scroll_to(self.first + int(amount))
+
+    def last_page_start(self):
+        return max(len(self.store) - self.rows, 0)
+
+    def scroll_to(self, first):
+        self.first = min(max(first, 0), self.last_page_start())
+        self.follow = self.first == self.last_page_start()
+        self.redraw()
+
+    def poll(self):
+        if not self.winfo_exists():
+            return
+        if self.store.version != self.drawn_version:
+            if self.follow:
+                self.first = self.last_page_start()
+            self.redraw()
+        self.after(self.REFRESH_MS, self.poll)
+
+    def redraw(self):
+        self.drawn_version = self.store.version
+        self.first = min(self.first, self.last_page_start())
+        records = self.store.slice(self.first, self.first + self.rows)
+        chunks = []
+        for record in records:
+            chunks.extend((format_record(record) + "\n", ("highlight",) if record.get("highlight") else ()))
+        self.text.config(state="normal")
+        self.text.delete("1.0", tk.END)
+        if chunks:
+            self.text.insert("1.0", *chunks)
+        self.text.config(state="disabled")
+
+        total = len(self.store)
+        if total:
+            self.scrollbar.set(self.first / total, min((self.first + self.rows) / total, 1.0))
+        else:
+            self.scrollbar.set(0.0, 1.0)
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "andra_portabila")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+HASH_BLOCK = 1 << 20
+EVICT_INTERVAL = 100  # Writes between directory scans, to see entries other processes added
+EVICT_TO = 0.9  # Eviction goes down to this fraction of max_bytes, leaving room for the next writes
+
+def json_default(value):
+    # Results hold NumPy arrays (MIDI note numbers) and NumPy scalars
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return float(value)
+
+class ResultCache:
+    """Analysis results on disk, keyed by file contents plus analysis parameters.
+
+    Entries are written to a temporary file and renamed into place, so readers never
+    see a partial entry and several processes can share one directory. Reads refresh
+    the entry's modification time, and once the directory grows past max_bytes the
+    oldest entries are evicted until it is back under EVICT_TO of that. The directory
+    is only scanned on the first write, when the sizes written since the last scan
+    take the total past max_bytes, and every EVICT_INTERVAL writes.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._digests = {}
+        self._total_bytes = 0  # As of the last scan, plus what this process wrote since
+        self._writes_since_scan = EVICT_INTERVAL  # Scan on the first write
+        os.makedirs(directory, exist_ok=True)
+
+    def file_digest(self, path):
+        # Re-hashing is skipped while the file's size and mtime are unchanged
+        stat = os.stat(path)
+        memo_key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(memo_key)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                    hasher.update(block)
+            digest = hasher.hexdigest()
+            self._digests[memo_key] = digest
+        return digest
+
+    def key(self, path, params):
+        params_text = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(f"{self.file_digest(path)}:{params_text}".encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:  # Evicted meanwhile, or a read-only cache
+            pass
+        return value
+
+    def put(self, key, value):
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(value, f, default=json_default)
+                size = f.tell()
+            os.replace(temp_path, entry_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self._total_bytes += size
+        self._writes_since_scan += 1
+        if self._total_bytes > self.max_bytes or self._writes_since_scan >= EVICT_INTERVAL:
+            self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for folder, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                entry_path = os.path.join(folder, name)
+                try:
+                    stat = os.stat(entry_path)
+                except FileNotFoundError:  # Evicted by another process meanwhile
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+                total += stat.st_size
+        entries.sort()
+        target = self.max_bytes * EVICT_TO if total > self.max_bytes else self.max_bytes
+        for _, size, entry_path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total_bytes = total
+        self._writes_since_scan = 0
+
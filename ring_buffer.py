@@ -0,0 +1,104 @@
+import time
+import numpy as np
+
+class AudioRingBuffer:
+    """Single-producer, single-consumer ring of fixed-size audio blocks.
+
+    The producer (the PortAudio callback) only copies into a preallocated slot and
+    bumps its own counter; it never takes a lock and never waits for the consumer.
+    Nothing signals the consumer either, since waking a thread means taking a lock:
+    the consumer polls the counter every POLL_INTERVAL seconds instead.
+    When the ring is full, overflow decides what is lost: "drop_newest" discards the
+    incoming block, "drop_oldest" overwrites the oldest unread one and the consumer
+    skips ahead when it notices it has been lapped.
+    """
+
+    OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+    POLL_INTERVAL = 0.001  # Well under the shortest live hop (256 samples, 5.8 ms at 44.1 kHz)
+
+    def __init__(self, capacity, block_size, overflow="drop_oldest"):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.capacity = capacity
+        self.block_size = block_size
+        self.overflow = overflow
+        self.blocks = np.zeros((capacity, block_size), dtype=np.float32)
+        self.lengths = np.zeros(capacity, dtype=np.int64)
+        self.timestamps = np.zeros(capacity)
+        self.write_count = 0  # Only written by the producer
+        self.read_count = 0   # Only written by the consumer
+        self.overruns = 0     # Blocks written while the ring was full
+        self.skipped = 0      # Blocks the consumer lost to drop_oldest
+
+    def depth(self):
+        return min(self.write_count - self.read_count, self.capacity)
+
+    def write(self, block, timestamp):
+        """Producer side. Returns False when the block was dropped."""
+        if self.write_count - self.read_count >= self.capacity:
+            self.overruns += 1
+            if self.overflow == "drop_newest":
+                return False
+        slot = self.write_count % self.capacity
+        length = min(len(block), self.block_size)
+        self.blocks[slot, :length] = block[:length]
+        self.lengths[slot] = length
+        self.timestamps[slot] = timestamp
+        self.write_count += 1
+        return True
+
+    def read(self):
+        """Consumer side. Returns (block copy, timestamp) or None when the ring is empty."""
+        while True:
+            written = self.write_count
+            # With drop_oldest, the producer's next block goes into the oldest slot once the ring
+            # is full, so that slot is given up before copying it rather than read half-written
+            if self.overflow == "drop_oldest" and written - self.read_count >= self.capacity:
+                lost = written - self.read_count - self.capacity + 1
+                self.skipped += lost
+                self.read_count += lost
+            if self.read_count == written:
+                return None
+            slot = self.read_count % self.capacity
+            block = self.blocks[slot, :self.lengths[slot]].copy()
+            timestamp = self.timestamps[slot]
+            # The producer may have started on this slot while it was being copied; write_count
+            # only moves once the slot is complete, so a slot in progress already counts
+            if self.overflow == "drop_oldest" and self.write_count - self.read_count >= self.capacity:
+                continue
+            self.read_count += 1
+            return block, timestamp
+
+    def wait(self, timeout):
+        """Consumer side: sleep until a block is waiting or timeout passes."""
+        deadline = time.monotonic() + timeout
+        while self.write_count == self.read_count and time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+
+class SlidingWindow:
+    """The last `size` samples of a stream, readable as one contiguous array.
+
+    Every sample is stored twice, `size` apart, so the current window is always the
+    slice buf[pos:pos + size] and reading it never copies or wraps. Consumer-thread only.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.buf = np.zeros(2 * size, dtype=np.float32)
+        self.pos = 0
+        self.filled = 0
+
+    def push(self, block):
+        block = np.asarray(block, dtype=np.float32)[-self.size:]
+        idx = (self.pos + np.arange(len(block))) % self.size
+        self.buf[idx] = block
+        self.buf[idx + self.size] = block
+        self.pos = (self.pos + len(block)) % self.size
+        self.filled = min(self.filled + len(block), self.size)
+
+    def is_full(self):
+        return self.filled == self.size
+
+    def window(self):
+        """Oldest to newest; a view that the next push() overwrites."""
+        return self.buf[self.pos:self.pos + self.size]
@@ -0,0 +1,68 @@
+"""Spectral-change gating: skip the full analysis of frames whose spectrum has not moved.
+
+A frame's change is the relative L1 distance between its magnitude spectrum and the
+spectrum of the last fully analyzed frame. Measuring against that frame rather than the
+previous one means a slow drift still triggers a new analysis once it adds up. Below
+CHANGE_TOLERANCE the last full result is carried forward, but never for longer than
+MAX_INTERVAL seconds.
+
+A result is only carried once it has settled. The last two analyzed frames must be within
+tolerance of each other, and their results must agree when results are given, as in live
+mode, where note and chord smoothing take a few frames to follow a change.
+"""
+
+import numpy as np
+
+CHANGE_TOLERANCE = 0.3
+MAX_INTERVAL = 2.0  # seconds
+
+def spectral_change(magnitude, reference):
+    """Relative L1 distance between magnitude spectra, along the last axis."""
+    return np.abs(magnitude - reference).sum(axis=-1) / (np.sum(reference, axis=-1) + 1e-12)
+
+class SpectralGate:
+    """Gate state for one stream of frames, e.g. the live input or one file shard."""
+
+    def __init__(self, tolerance=CHANGE_TOLERANCE, max_interval=MAX_INTERVAL):
+        self.tolerance = tolerance
+        self.max_interval = max_interval
+        self.analyzed_frames = 0
+        self.skipped_frames = 0
+        self.forget()
+
+    def forget(self):
+        # After silence or a change of frame length, the next frame is always analyzed
+        self.reference = None
+        self.reference_time = 0.0
+        self.result = None
+        self.result_key = None
+        self.settled = False
+
+    def can_skip(self, magnitude, now):
+        """True when the last full result still describes this frame; counts the frame either way."""
+        skip = (self.settled and len(self.reference) == len(magnitude)
+                and now - self.reference_time < self.max_interval
+                and spectral_change(magnitude, self.reference) < self.tolerance)
+        if skip:
+            self.skipped_frames += 1
+        else:
+            self.analyzed_frames += 1
+        return skip
+
+    def analyzed(self, magnitude, now, result=None):
+        """Make a fully analyzed frame the new reference."""
+        settled = (self.reference is not None and len(self.reference) == len(magnitude)
+                   and spectral_change(magnitude, self.reference) < self.tolerance)
+        if result is not None:
+            key = (result["chord"], tuple(result["midi"]))
+            settled = settled and key == self.result_key
+            self.result_key = key
+        self.settled = settled
+        self.reference = np.array(magnitude)  # magnitude may be a reused scratch buffer
+        self.reference_time = now
+        self.result = result
+
+    def stats(self):
+        total = self.analyzed_frames + self.skipped_frames
+        return {"analyzed_frames": self.analyzed_frames, "skipped_frames": self.skipped_frames,
+                "skipped_fraction": self.skipped_frames / total if total else 0.0}
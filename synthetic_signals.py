@@ -0,0 +1,131 @@
+"""Deterministic test signals with known ground truth, for benchmark.py.
+
+Everything is generated from a seed, so two runs on any machine see identical samples.
+"""
+
+import wave
+import numpy as np
+from chord_table import NOTE_NAMES, CHORD_TYPES
+
+CHORD_INTERVALS = dict(CHORD_TYPES)
+
+# Relative amplitudes of harmonics 1..6, roughly a plucked or bowed string
+STRING_HARMONICS = (1.0, 0.5, 0.33, 0.25, 0.2, 0.15)
+PURE = (1.0,)
+
+def midi_to_frequency(midi):
+    return 440.0 * 2 ** ((np.asarray(midi, dtype=float) - 69) / 12)
+
+def midi_to_name(midi):
+    """Scientific pitch notation, C4 = MIDI 60."""
+    return f"{NOTE_NAMES[midi % 12]}{midi // 12 - 1}"
+
+def tone(frequency, duration, sample_rate=44100, harmonics=PURE, amplitude=0.3, rng=None):
+    """One note: a sum of harmonics with random (but seeded) starting phases."""
+    rng = rng if rng is not None else np.random.default_rng(0)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    signal = np.zeros(len(t))
+    for k, weight in enumerate(harmonics, start=1):
+        if k * frequency >= sample_rate / 2:
+            break
+        signal += weight * np.sin(2 * np.pi * k * frequency * t + rng.uniform(0, 2 * np.pi))
+    return (amplitude * signal / sum(harmonics)).astype(np.float32)
+
+def notes_signal(midis, duration, sample_rate=44100, harmonics=STRING_HARMONICS, detune_cents=0.0,
+                 amplitude=0.3, rng=None):
+    """Several simultaneous notes; each is detuned by a random amount up to +-detune_cents."""
+    rng = rng if rng is not None else np.random.default_rng(0)
+    signal = np.zeros(int(duration * sample_rate), dtype=np.float32)
+    for midi in midis:
+        cents = rng.uniform(-detune_cents, detune_cents) if detune_cents else 0.0
+        signal += tone(midi_to_frequency(midi + cents / 100), duration, sample_rate, harmonics,
+                       amplitude / len(midis), rng)
+    return signal
+
+def add_noise(signal, snr_db, rng=None):
+    rng = rng if rng is not None else np.random.default_rng(0)
+    power = np.mean(signal.astype(np.float64) ** 2)
+    noise = rng.standard_normal(len(signal)) * np.sqrt(power / 10 ** (snr_db / 10))
+    return (signal + noise).astype(np.float32)
+
+def silence(duration, sample_rate=44100):
+    return np.zeros(int(duration * sample_rate), dtype=np.float32)
+
+def chord_midis(root, chord_type, octave=3):
+    """Close-position chord in root position starting at root<octave>."""
+    base = NOTE_NAMES.index(root) + 12 * (octave + 1)
+    return [base + interval for interval in CHORD_INTERVALS[chord_type]]
+
+def make_case(name, midis, duration, sample_rate, **options):
+    """A signal plus what process_audio should report for it."""
+    snr_db = options.pop("snr_db", None)
+    chord_name = options.pop("chord_name", None)
+    rng = np.random.default_rng(options.pop("seed", 0))
+    if midis:
+        signal = notes_signal(midis, duration, sample_rate, rng=rng, **options)
+    else:
+        signal = silence(duration, sample_rate)
+    if snr_db is not None:
+        signal = add_noise(signal, snr_db, rng)
+    return {
+        "name": name,
+        "signal": signal,
+        "midis": list(midis),
+        "notes": [midi_to_name(midi) for midi in midis],
+        "chord": expected_chord(midis, chord_name),
+    }
+
+def expected_chord(midis, chord_name=None):
+    if chord_name:
+        return chord_name
+    if not midis:
+        return "No notes"
+    if len(midis) == 1:
+        return f"{NOTE_NAMES[midis[0] % 12]} note"
+    return None  # Not scored
+
+def accuracy_cases(duration=1.0, sample_rate=44100, seed=0):
+    """Pure tones, harmonic tones, chords, detuned chords, noisy chords and silence."""
+    cases = []
+    rng = np.random.default_rng(seed)
+    for midi in (40, 45, 52, 57, 60, 64, 69, 76, 81):
+        cases.append(make_case(f"pure {midi_to_name(midi)}", [midi], duration, sample_rate,
+                               harmonics=PURE, seed=int(rng.integers(1 << 31))))
+        cases.append(make_case(f"string {midi_to_name(midi)}", [midi], duration, sample_rate,
+                               seed=int(rng.integers(1 << 31))))
+    chords = [("C", "Major"), ("A", "Minor"), ("G", "Major"), ("E", "Minor"), ("D", "7"),
+              ("F", "Maj7"), ("B", "Diminished"), ("D", "Sus4"), ("A", "m7"), ("C", "Augmented")]
+    for root, chord_type in chords:
+        midis = chord_midis(root, chord_type, octave=3)
+        name = f"{root} {chord_type}"
+        cases.append(make_case(f"chord {name}", midis, duration, sample_rate, chord_name=name,
+                               seed=int(rng.integers(1 << 31))))
+        cases.append(make_case(f"detuned chord {name}", midis, duration, sample_rate, chord_name=name,
+                               detune_cents=15, seed=int(rng.integers(1 << 31))))
+        cases.append(make_case(f"noisy chord {name}", midis, duration, sample_rate, chord_name=name,
+                               snr_db=20, seed=int(rng.integers(1 << 31))))
+    cases.append(make_case("silence", [], duration, sample_rate))
+    return cases
+
+def chord_sequence(seconds_per_chord=2.0, repeats=4, sample_rate=44100, seed=0):
+    """A chord progression with its ground-truth timeline: (signal, [(start_s, end_s, chord name)])."""
+    progression = [("C", "Major"), ("A", "Minor"), ("F", "Major"), ("G", "7")]
+    rng = np.random.default_rng(seed)
+    segments, timeline = [], []
+    for i in range(repeats * len(progression)):
+        root, chord_type = progression[i % len(progression)]
+        midis = chord_midis(root, chord_type, octave=3)
+        segment = notes_signal(midis, seconds_per_chord, sample_rate, detune_cents=5, rng=rng)
+        segments.append(add_noise(segment, 30, rng))
+        start = i * seconds_per_chord
+        timeline.append((start, start + seconds_per_chord, f"{root} {chord_type}"))
+    return np.concatenate(segments), timeline
+
+def write_wav(path, signal, sample_rate=44100):
+    """16-bit PCM mono, the format the memory-mapped reader handles directly."""
+    pcm = np.clip(np.round(signal * 32767), -32768, 32767).astype('<i2')
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
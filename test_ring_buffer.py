@@ -0,0 +1,99 @@
+"""Interleavings of AudioRingBuffer's producer and consumer, replayed deterministically.
+
+The blocks array is swapped for a stand-in that hands control to the other side halfway
+through a slot copy, at the point where the real threads can overlap (NumPy releases the
+GIL while copying large blocks). A block read back must never mix two writes.
+"""
+
+import numpy as np
+from ring_buffer import AudioRingBuffer
+
+CAPACITY = 4
+BLOCK_SIZE = 8
+
+def block(value):
+    return np.full(BLOCK_SIZE, value, dtype=np.float32)
+
+class HalfwayCopy:
+    """The consumer's view of one slot: copy() runs `between` after copying the first half."""
+
+    def __init__(self, view, between):
+        self.view = view
+        self.between = between
+
+    def copy(self):
+        half = len(self.view) // 2
+        first = self.view[:half].copy()
+        self.between()
+        return np.concatenate((first, self.view[half:]))
+
+class InterleavedBlocks:
+    """Stands in for ring.blocks; calls on_write / on_read halfway through the next slot copy."""
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.on_write = None
+        self.on_read = None
+
+    def __setitem__(self, key, value):
+        on_write, self.on_write = self.on_write, None
+        if on_write is None:
+            self.blocks[key] = value
+            return
+        half = BLOCK_SIZE // 2
+        slot = key[0]
+        self.blocks[slot, :half] = value[:half]
+        on_write()
+        self.blocks[slot, half:] = value[half:]
+
+    def __getitem__(self, key):
+        on_read, self.on_read = self.on_read, None
+        if on_read is None:
+            return self.blocks[key]
+        return HalfwayCopy(self.blocks[key], on_read)
+
+def ring_with(blocks):
+    ring = AudioRingBuffer(CAPACITY, BLOCK_SIZE, "drop_oldest")
+    ring.blocks = InterleavedBlocks(ring.blocks)
+    for value in range(blocks):
+        ring.write(block(value), float(value))
+    return ring
+
+def assert_whole(item):
+    data, timestamp = item
+    assert np.all(data == data[0]), f"torn block {data}"
+    assert data[0] == timestamp
+
+def test_read_while_producer_overwrites_oldest_slot():
+    # The producer is halfway through the block that replaces the oldest one when the consumer reads
+    ring = ring_with(CAPACITY)
+    reads = []
+    ring.blocks.on_write = lambda: reads.append(ring.read())
+    ring.write(block(CAPACITY), float(CAPACITY))
+    assert_whole(reads[0])
+    assert reads[0][1] == 1  # The slot being overwritten was given up
+    assert ring.skipped == 1
+
+def test_producer_starts_on_slot_during_copy():
+    # While the consumer copies the oldest block, the producer finishes the block that fills
+    # the ring and has already stored the next one over the slot being copied, but has not
+    # counted it yet
+    ring = ring_with(CAPACITY - 1)
+
+    def producer():
+        ring.write(block(CAPACITY - 1), float(CAPACITY - 1))
+        ring.blocks.blocks[0] = CAPACITY  # Slot 0, write_count not bumped yet
+
+    ring.blocks.on_read = producer
+    item = ring.read()
+    assert_whole(item)
+    assert item[1] == 1
+
+def test_full_ring_still_reads():
+    # A full ring that the producer is not touching keeps returning blocks in order
+    ring = ring_with(CAPACITY)
+    values = []
+    while (item := ring.read()) is not None:
+        assert_whole(item)
+        values.append(item[1])
+    assert values == sorted(values) and values[-1] == CAPACITY - 1
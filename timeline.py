@@ -0,0 +1,143 @@
+"""Chunk results of a file as one NumPy structured array instead of a list of dicts.
+
+Each row is a start time, up to MAX_NOTES MIDI numbers (padded with -1), an interned
+chord id and a confidence: 28 bytes per chunk, whatever the notes and chord names.
+Chord names live once in `chords`; a row's id indexes into it.
+"""
+
+import numpy as np
+from chord_table import midi_to_names
+
+MAX_NOTES = 4
+NO_CHORD_NAMES = ("No chord detected", "Error")  # Not counted as chords in summaries
+
+TIMELINE_DTYPE = np.dtype([
+    ("time", np.float64),
+    ("midi", np.int16, (MAX_NOTES,)),
+    ("chord", np.int32),
+    ("confidence", np.float64),
+])
+
+class ResultTimeline:
+    """Growable, time-ordered table of chunk results."""
+
+    def __init__(self, capacity=1024, chords=None):
+        self._rows = np.empty(capacity, dtype=TIMELINE_DTYPE)
+        self._size = 0
+        self.chords = list(chords) if chords is not None else []
+        self._chord_ids = {name: i for i, name in enumerate(self.chords)}
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def rows(self):
+        return self._rows[:self._size]
+
+    @property
+    def times(self):
+        return self.rows["time"]
+
+    def chord_id(self, name):
+        chord_id = self._chord_ids.get(name)
+        if chord_id is None:
+            chord_id = self._chord_ids[name] = len(self.chords)
+            self.chords.append(name)
+        return chord_id
+
+    def append(self, result):
+        """Add one process_audio result; results must arrive in time order."""
+        if self._size == len(self._rows):
+            grown = np.empty(max(len(self._rows) * 2, 16), dtype=TIMELINE_DTYPE)
+            grown[:self._size] = self._rows[:self._size]
+            self._rows = grown
+        row = self._rows[self._size]
+        midi = np.asarray(result["midi"])[:MAX_NOTES]
+        row["midi"] = -1
+        row["midi"][:len(midi)] = midi
+        row["time"] = result["time_position"]
+        row["chord"] = self.chord_id(result["chord"])
+        row["confidence"] = result["confidence"]
+        self._size += 1
+
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+        return self
+
+    def between(self, start, end):
+        """Rows with start <= time < end, as a timeline sharing this one's chord names."""
+        lo, hi = np.searchsorted(self.times, (start, end), "left")
+        part = ResultTimeline(0, self.chords)
+        part._rows = self.rows[lo:hi].copy()
+        part._size = hi - lo
+        return part
+
+    def notes(self):
+        """Every distinct MIDI number that occurs, lowest first."""
+        midi = self.rows["midi"]
+        return np.unique(midi[midi >= 0])
+
+    def chord_counts(self):
+        """{chord name: chunks}, chords in order of first appearance, without the no-chord names."""
+        ids = self.rows["chord"]
+        present, first = np.unique(ids, return_index=True)
+        counts = np.bincount(ids, minlength=len(self.chords))
+        return {self.chords[i]: int(counts[i]) for i in present[np.argsort(first)]
+                if self.chords[i] not in NO_CHORD_NAMES}
+
+    def summary(self):
+        """Notes and chords of the whole timeline, as shown for an analyzed file."""
+        chord_counts = self.chord_counts()
+        total_chunks = len(self)
+        # Get the most common chords (more than 5% of occurrences)
+        significant_chords = [chord for chord, count in chord_counts.items() if count / total_chunks > 0.05]
+        # If too many chords, take the most frequent ones (ties in order of appearance)
+        if len(significant_chords) > 8:
+            significant_chords = sorted(chord_counts, key=chord_counts.get, reverse=True)[:8]
+        return {
+            "notes": sorted(midi_to_names(self.notes())),
+            "chords": significant_chords,
+            "chord_counts": chord_counts,
+            "chunks_with_notes": total_chunks,
+        }
+
+    def chord_names(self):
+        return [self.chords[i] for i in self.rows["chord"]]
+
+    def to_results(self):
+        """The rows as result dicts, e.g. for JSON output."""
+        results = []
+        for row in self.rows:
+            midi = row["midi"][row["midi"] >= 0]
+            results.append({"notes": midi_to_names(midi), "midi": midi, "chord": self.chords[row["chord"]],
+                            "confidence": float(row["confidence"]), "time_position": float(row["time"])})
+        return results
+
+    def columns(self):
+        """Column arrays plus the chord names; JSON-serializable after json_default."""
+        rows = self.rows
+        return {"time": rows["time"], "midi": rows["midi"], "chord": rows["chord"],
+                "confidence": rows["confidence"], "chords": self.chords}
+
+    @classmethod
+    def from_columns(cls, columns):
+        timeline = cls(len(columns["time"]), columns["chords"])
+        rows = timeline._rows
+        for name in ("time", "midi", "chord", "confidence"):
+            rows[name] = np.asarray(columns[name], dtype=TIMELINE_DTYPE[name].base).reshape(rows[name].shape)
+        timeline._size = len(rows)
+        return timeline
+
+    def save(self, path):
+        """Write an .npz holding the rows and the chord names."""
+        np.savez(path, rows=self.rows, chords=np.array(self.chords, dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            rows = data["rows"]
+            timeline = cls(0, data["chords"].tolist())
+        timeline._rows = rows
+        timeline._size = len(rows)
+        return timeline